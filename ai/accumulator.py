@@ -0,0 +1,163 @@
+"""
+The evaluation model's first layer multiplies its 768 input bits by a 768x768 weight matrix, but a move only changes 2 to
+4 of those bits. The accumulator keeps the first layer's output (before the ReLU) for every position along the line of
+play in a stack, and each move adds or subtracts only the weight columns of the bits it changes. Scoring a position then
+only costs the ReLU and the output layer's dot product, rather than the whole forward pass. This works the same way as
+the efficiently updatable neural networks (NNUE) of other chess engines.
+
+Usage, from the root of the repository:
+    python -m ai.accumulator 20
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+MAX_PLY = 256  # Amount of positions the stack holds before growing
+
+
+class Accumulator:
+    """
+    A stack of first layer outputs of a model with a single hidden layer, kept in sync with a game state by
+    GameState.set_accumulator. The top of the stack belongs to the current position.
+    """
+
+    def __init__(
+        self,
+        hidden_weights: np.ndarray,
+        hidden_bias: np.ndarray,
+        output_weights: np.ndarray,
+        output_bias: float,
+    ) -> None:
+        # each row holds the weights of one input bit, so adding a piece to a square adds one contiguous row
+        self.feature_weights = np.ascontiguousarray(hidden_weights.T, dtype=np.float32)
+        self.hidden_bias = np.asarray(hidden_bias, dtype=np.float32)
+        self.output_weights = np.asarray(output_weights, dtype=np.float32).reshape(-1)
+        self.output_bias = float(output_bias)
+        self.stack = np.zeros((MAX_PLY, len(self.hidden_bias)), dtype=np.float32)
+        self.ply = 0
+
+    @classmethod
+    def from_model(cls, model) -> "Accumulator":
+        """
+        Creates an accumulator from the weights of an evaluation model with two linear layers, such as the
+        BoardEvaluationModel with a layer count of 2. The model may be compiled, but not quantized.
+        """
+        from ai.numpy_model import NumpyModel
+
+        if isinstance(model, NumpyModel):
+            return cls(model.hidden_weights, model.hidden_bias, model.output_weights, model.output_bias)
+        state = {name: tensor.detach().cpu().numpy() for name, tensor in model.state_dict().items()}
+        weights = [name for name in state if name.endswith(".weight")]
+        if len(weights) != 2:
+            raise ValueError(f"an accumulator needs a float model with 2 linear layers, not {len(weights)}")
+        hidden, output = (name[: -len(".weight")] for name in weights)
+        return cls(
+            state[f"{hidden}.weight"], state[f"{hidden}.bias"], state[f"{output}.weight"], state[f"{output}.bias"][0]
+        )
+
+    def refresh(self, bitboards: list) -> None:
+        """
+        Computes the first layer's output for the given piece bitboards from scratch, leaving it as the only entry of the
+        stack.
+        """
+        features = [
+            index << 6 | square
+            for index, bitboard in enumerate(bitboards)
+            for square in range(64)
+            if bitboard >> square & 1
+        ]
+        self.ply = 0
+        self.stack[0] = self.hidden_bias + self.feature_weights[features].sum(axis=0)
+
+    def push(self, removed: list, added: list) -> None:
+        """
+        Pushes the first layer's output of the position reached by a move, given the input bits it clears and sets.
+        """
+        if self.ply + 1 == len(self.stack):
+            self.stack = np.concatenate([self.stack, np.zeros_like(self.stack)])
+        accumulator = self.stack[self.ply + 1]
+        np.copyto(accumulator, self.stack[self.ply])
+        for feature in removed:
+            accumulator -= self.feature_weights[feature]
+        for feature in added:
+            accumulator += self.feature_weights[feature]
+        self.ply += 1
+
+    def pop(self, bitboards: list) -> None:
+        """
+        Pops the first layer's output of the position a move was undone from. Undoing a move made before the
+        accumulator was attached empties the stack, so it is refreshed from the piece bitboards given as an argument.
+        """
+        if self.ply == 0:
+            self.refresh(bitboards)
+        else:
+            self.ply -= 1
+
+    def evaluate(self) -> float:
+        """
+        Returns the model's output for the current position.
+        """
+        hidden = np.maximum(self.stack[self.ply], 0)
+        return float(hidden @ self.output_weights) + self.output_bias
+
+    def evaluate_moves(self, feature_changes: list) -> list:
+        """
+        Returns the model's output for the positions reached by several moves from the current position, given the
+        input bits each of them clears and sets, without pushing them.
+        """
+        hidden = np.repeat(self.stack[self.ply][np.newaxis], len(feature_changes), axis=0)
+        for row, (removed, added) in zip(hidden, feature_changes):
+            for feature in removed:
+                row -= self.feature_weights[feature]
+            for feature in added:
+                row += self.feature_weights[feature]
+        np.maximum(hidden, 0, out=hidden)
+        return (hidden @ self.output_weights + self.output_bias).tolist()
+
+
+def verify_accumulator(model, game_count: int, seed: int) -> bool:
+    """
+    Plays random games with an accumulator attached, undoing some of the moves along the way, and checks that its
+    output matches the dense forward pass of the model in every position reached. Returns false if any differ by more
+    than float tolerance.
+    """
+    import torch
+
+    from ai.encoding import BoardEncoder
+    from engine.random_games import random_games
+
+    encoder = BoardEncoder()
+    accumulator = Accumulator.from_model(model)
+    positions = 0
+    largest_error = 0.0
+    for game_state, legal_moves in random_games(game_count, seed, undo_rate=0.1):
+        # every game starts with a new game state, which the accumulator is attached to before its first move
+        if game_state.accumulator is None:
+            game_state.set_accumulator(accumulator)
+        with torch.no_grad():
+            expected = model(torch.from_numpy(encoder.encode([game_state.position.bitboards]))).item()
+            expected_moves = model(
+                torch.from_numpy(encoder.encode([game_state.bitboards_after_move(move) for move in legal_moves]))
+            ).flatten()
+        scores = accumulator.evaluate_moves([game_state.move_feature_changes(move) for move in legal_moves])
+        errors = [abs(accumulator.evaluate() - expected)] + [
+            abs(score - expected_score) for score, expected_score in zip(scores, expected_moves.tolist())
+        ]
+        largest_error = max(largest_error, *errors)
+        positions += 1
+
+    print(f"{positions} positions from {game_count} random games, largest difference {largest_error:.2e}")
+    return largest_error < 1e-3
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifies the accumulator against the dense forward pass of the model.")
+    parser.add_argument("games", type=int, help="amount of random games to play")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from ai.model import load_model
+
+    sys.exit(0 if verify_accumulator(load_model(), args.games, args.seed) else 1)
@@ -0,0 +1,136 @@
+"""
+Searches a set of benchmark positions to a fixed depth and reports how many nodes each search needed and how long it
+took. Since the positions and depth are fixed, the node counts measure how well the search prunes, for example with and
+without move ordering.
+
+Usage, from the root of the repository:
+    python -m ai.benchmark 3
+    python -m ai.benchmark 3 --no-move-ordering
+    python -m ai.benchmark 2 --quiescence-depth 0
+    python -m ai.benchmark 3 --no-accumulator
+    python -m ai.benchmark 3 --no-accumulator --backend int8 --jit script
+    python -m ai.benchmark 5 --no-pvs --no-null-move --no-late-move-reductions
+"""
+
+import argparse
+import math
+import random
+import time
+
+import numpy as np
+
+from constants import EVALUATION_CACHE_SIZE, MODEL_BACKEND
+from ai.accumulator import Accumulator
+from ai.evaluation_cache import EvaluationCache
+from ai.negamax import QUIESCENCE_DEPTH, SearchContext, ab_negamax
+from ai.numpy_model import load_numpy_model
+from ai.transposition import TranspositionTable
+from engine.game_state import GameState
+from engine.movement import move_notation
+from engine.perft import PERFT_POSITIONS
+
+BENCHMARK_POSITIONS = PERFT_POSITIONS + [
+    "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w - - 2 3",
+    "r1bq1rk1/ppp2ppp/2np1n2/2b1p3/2B1P3/2NP1N2/PPP2PPP/R1BQ1RK1 w - - 0 7",
+    "8/5k2/3p4/1p1Pp2p/pP2Pp1P/P4P1K/8/8 b - - 99 50",
+    "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+]
+
+
+def benchmark(
+    model,
+    fens: list,
+    depth: int,
+    use_move_ordering: bool,
+    quiescence_depth: int,
+    use_accumulator: bool,
+    use_evaluation_cache: bool,
+    use_pvs: bool,
+    use_null_move: bool,
+    use_late_move_reductions: bool,
+    seed: int,
+) -> None:
+    """
+    Searches every position given as an argument to a fixed depth, iteratively deepened the same way as a search for
+    the AI's move, and reports the nodes searched and time taken.
+    """
+    total_nodes = 0
+    total_time = 0
+    for fen in fens:
+        # ties between moves are broken randomly, so the generators are seeded to make the node counts repeatable
+        random.seed(seed)
+        np.random.seed(seed)
+        game_state = GameState(fen)
+        if use_accumulator:
+            game_state.set_accumulator(Accumulator.from_model(model))
+        legal_moves = game_state.get_legal_moves()
+        transposition_table = TranspositionTable(16)
+        transposition_table.new_search()
+        search = SearchContext(
+            transposition_table,
+            use_move_ordering=use_move_ordering,
+            quiescence_depth=quiescence_depth,
+            evaluation_cache=EvaluationCache(EVALUATION_CACHE_SIZE) if use_evaluation_cache else None,
+            use_pvs=use_pvs,
+            use_null_move=use_null_move,
+            use_late_move_reductions=use_late_move_reductions,
+        )
+
+        start_time = time.perf_counter()
+        for iteration_depth in range(1, depth + 1):
+            score, move = ab_negamax(model, game_state, legal_moves, iteration_depth, 0, -math.inf, math.inf, search)
+        elapsed = time.perf_counter() - start_time
+        total_nodes += search.nodes
+        total_time += elapsed
+
+        best_move = move_notation(move) if move is not None else "none"
+        print(f"{fen}\n    depth {depth}: {search.nodes} nodes in {elapsed:.2f}s, best move {best_move} ({score:.3f})")
+
+    print(f"total: {total_nodes} nodes in {total_time:.2f}s ({total_nodes / total_time:,.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fixed depth search benchmark.")
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--fen", help="position to search, defaults to the whole benchmark set")
+    parser.add_argument("--no-move-ordering", action="store_true", help="search moves in the order they are generated")
+    parser.add_argument(
+        "--quiescence-depth", type=int, default=QUIESCENCE_DEPTH, help="captures searched past the leaves, 0 to disable"
+    )
+    parser.add_argument(
+        "--no-accumulator", action="store_true", help="score every position with a forward pass of the whole model"
+    )
+    parser.add_argument("--no-evaluation-cache", action="store_true", help="score positions again every time")
+    parser.add_argument("--no-pvs", action="store_true", help="search every move with the full window")
+    parser.add_argument("--no-null-move", action="store_true", help="never prune by passing the turn")
+    parser.add_argument("--no-late-move-reductions", action="store_true", help="search every move to the full depth")
+    parser.add_argument("--backend", choices=["numpy", "float", "int8"], default=MODEL_BACKEND, help="how the model is run")
+    parser.add_argument("--jit", choices=["script", "trace"], help="compile the torch model with TorchScript")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if args.backend == "int8" and not args.no_accumulator:
+        parser.error("the accumulator needs float weights, add --no-accumulator")
+    if args.backend == "numpy" and args.jit:
+        parser.error("only the torch backends can be compiled with TorchScript")
+
+    if args.backend == "numpy":
+        model = load_numpy_model()
+    else:
+        from ai.model import load_model
+
+        model = load_model(backend=args.backend, jit=args.jit)
+
+    fens = [args.fen] if args.fen else BENCHMARK_POSITIONS
+    benchmark(
+        model,
+        fens,
+        args.depth,
+        not args.no_move_ordering,
+        args.quiescence_depth,
+        not args.no_accumulator,
+        not args.no_evaluation_cache,
+        not args.no_pvs,
+        not args.no_null_move,
+        not args.no_late_move_reductions,
+        args.seed,
+    )
@@ -0,0 +1,379 @@
+"""
+The evaluation model was trained on positions with plenty of material, so it judges the simplest endgames poorly, and
+the mates in them are often too far away for the search to find. Bitbases hold the exact result of every position of an
+endgame with a King and one other piece against a lone King (KQK, KRK and KPK), one bit per position, which is set if
+the side with the extra piece wins. A lone King can never win, so a cleared bit means a draw.
+
+The bitbases are generated by retrograde analysis using the move generator's attack tables: starting from every
+checkmate, positions are marked as won for the stronger side as long as they have a move into a won position, or for the
+lone King, only moves into won positions. Generating them takes a while, so it is a separate step run once, after which
+each 64KiB bitbase is memory-mapped from disk. Without them the AI plays these endgames by searching alone.
+
+Usage, from the root of the repository:
+    python -m ai.bitbase generate
+    python -m ai.bitbase verify 100
+"""
+
+import argparse
+import logging
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+from constants import *
+from engine.bitboard import PIECE_INDEX, count_squares, iterate_squares
+from pieces.main import ORTHOGONAL_OFFSETS, DIAGONAL_OFFSETS, sliding_movement
+from pieces.king import KING_ATTACKS
+from pieces.pawn import PAWN_ATTACKS, forward_movement
+
+# anchored at the repository rather than the working directory, so every tool finds the same bitbases
+BITBASE_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "model", "bitbases")
+# the bitbases of promotions are needed to generate the Pawn's, so they come first
+BITBASE_PIECES = {"kqk": QUEEN, "krk": ROOK, "kpk": PAWN}
+BITBASE_WIN_SCORE = 100.0  # Score of a won bitbase position, above any score of the evaluation model
+POSITION_COUNT = 2 * 64 * 64 * 64
+
+logger = logging.getLogger(__name__)
+
+
+def bitbase_index(black_to_move: int, strong_king: int, weak_king: int, piece: int) -> int:
+    """
+    Returns the index of a position in a bitbase, where white is the side with the extra piece.
+    """
+    return ((black_to_move << 6 | strong_king) << 6 | weak_king) << 6 | piece
+
+
+def piece_attacks(piece_type: str, square: int, occupied: int) -> int:
+    """
+    Returns the squares attacked by a white piece of the given type on the given square.
+    """
+    if piece_type == PAWN:
+        return PAWN_ATTACKS[WHITE][square]
+    offsets = ORTHOGONAL_OFFSETS if piece_type == ROOK else ORTHOGONAL_OFFSETS + DIAGONAL_OFFSETS
+    attacks = 0
+    for offset in offsets:
+        attacks |= sliding_movement(square, offset, occupied)
+    return attacks
+
+
+def generate_bitbase(piece_type: str, promotion_bitbases: list = ()) -> np.ndarray:
+    """
+    Generates the bitbase of white's King and a piece of the given type against black's lone King, as an array of
+    booleans set for the positions white wins. A Pawn's promotions are looked up in the bitbases given as an argument.
+    """
+    white_edges = ([], [])
+    black_edges = ([], [])
+    black_moves = np.zeros(POSITION_COUNT, dtype=np.int32)
+    checkmates = np.zeros(POSITION_COUNT, dtype=bool)
+    # black to move can draw straight away by capturing the piece
+    escapes = np.zeros(POSITION_COUNT, dtype=bool)
+    # white to move can promote into a won position
+    promotions = np.zeros(POSITION_COUNT, dtype=bool)
+
+    for strong_king in range(64):
+        for weak_king in range(64):
+            if weak_king == strong_king or KING_ATTACKS[strong_king] >> weak_king & 1:
+                continue
+            for piece in range(64):
+                if piece in (strong_king, weak_king) or (piece_type == PAWN and piece // 8 in (0, 7)):
+                    continue
+                kings = 1 << strong_king | 1 << weak_king
+                attacks = piece_attacks(piece_type, piece, kings)
+
+                # with white to move, black's King can't already be in check
+                if not attacks >> weak_king & 1:
+                    index = bitbase_index(0, strong_king, weak_king, piece)
+                    targets = KING_ATTACKS[strong_king] & ~KING_ATTACKS[weak_king] & ~(1 << piece)
+                    for target in iterate_squares(targets):
+                        white_edges[0].append(index)
+                        white_edges[1].append(bitbase_index(1, target, weak_king, piece))
+
+                    if piece_type == PAWN:
+                        targets = forward_movement(piece, kings | 1 << piece, WHITE)
+                    else:
+                        targets = attacks & ~kings
+                    for target in iterate_squares(targets):
+                        if piece_type == PAWN and target < 8:
+                            # a Pawn may promote to a Rook where promoting to a Queen would be a stalemate
+                            promotions[index] |= any(
+                                bitbase[bitbase_index(1, strong_king, weak_king, target)]
+                                for bitbase in promotion_bitbases
+                            )
+                        else:
+                            white_edges[0].append(index)
+                            white_edges[1].append(bitbase_index(1, strong_king, weak_king, target))
+
+                index = bitbase_index(1, strong_king, weak_king, piece)
+                # the King moving away doesn't stop a sliding piece from attacking the squares behind it
+                guarded = KING_ATTACKS[strong_king] | piece_attacks(piece_type, piece, 1 << strong_king | 1 << piece)
+                targets = KING_ATTACKS[weak_king] & ~guarded
+                if targets >> piece & 1:
+                    escapes[index] = True
+                for target in iterate_squares(targets & ~(1 << piece)):
+                    black_edges[0].append(index)
+                    black_edges[1].append(bitbase_index(0, strong_king, target, piece))
+                    black_moves[index] += 1
+                if not targets and attacks >> weak_king & 1:
+                    checkmates[index] = True
+
+    white_sources, white_targets = (np.array(edges, dtype=np.int64) for edges in white_edges)
+    black_sources, black_targets = (np.array(edges, dtype=np.int64) for edges in black_edges)
+    black_has_moves = (black_moves > 0) & ~escapes
+
+    # positions are won once white has a move into a won position, or black only has moves into won positions
+    wins = checkmates | promotions
+    while True:
+        white_wins = np.bincount(white_sources, weights=wins[white_targets], minlength=POSITION_COUNT) > 0
+        black_wins = np.bincount(black_sources, weights=wins[black_targets], minlength=POSITION_COUNT)
+        updated_wins = checkmates | promotions | white_wins | (black_has_moves & (black_wins == black_moves))
+        if np.array_equal(updated_wins, wins):
+            return wins
+        wins = updated_wins
+
+
+class Bitbases:
+    """
+    The KQK, KRK and KPK bitbases found in the given directory, memory-mapped. Endgames whose bitbase is missing aren't
+    probed.
+    """
+
+    def __init__(self, directory: str = BITBASE_DIRECTORY) -> None:
+        self.bitbases = {}
+        for name, piece_type in BITBASE_PIECES.items():
+            path = os.path.join(directory, f"{name}.bin")
+            if os.path.isfile(path):
+                self.bitbases[piece_type] = np.memmap(path, dtype=np.uint8, mode="r")
+
+    def probe(self, game_state: object, ply: int = 0) -> float:
+        """
+        Returns the score of the current position from the point of view of the player to move, or None if there is
+        no bitbase for it. A checkmate scores the same as the search scores it, the given amount of plies from the root.
+        Won positions score higher the closer the weaker King is to the edge and to the other King, and the further a
+        Pawn has advanced, so the search makes progress towards checkmate while only seeing a few moves ahead.
+        """
+        position = game_state.position
+        if count_squares(position.occupied) != 3:
+            return None
+        bitboards = position.bitboards
+        for (team, piece_type), index in PIECE_INDEX.items():
+            if piece_type in BITBASE_PIECES.values() and bitboards[index]:
+                break
+        else:
+            return None
+
+        enemy_team = BLACK if team == WHITE else WHITE
+        strong_king = bitboards[PIECE_INDEX[(team, KING)]].bit_length() - 1
+        weak_king = bitboards[PIECE_INDEX[(enemy_team, KING)]].bit_length() - 1
+        piece = bitboards[index].bit_length() - 1
+        if team == BLACK:
+            # the bitbases have white as the stronger side, so black's pieces are mirrored onto white's side
+            strong_king ^= 56
+            weak_king ^= 56
+            piece ^= 56
+        black_to_move = int(game_state.turn != team)
+        bit = bitbase_index(black_to_move, strong_king, weak_king, piece)
+        bitbase = self.bitbases.get(piece_type)
+        if bitbase is None:
+            return None
+        if not bitbase[bit >> 3] >> (7 - (bit & 7)) & 1:
+            return 0.0
+        if black_to_move and game_state.king_in_check() and not game_state.get_legal_moves():
+            return -(MATE_SCORE - ply)
+
+        if piece_type == PAWN:
+            # the Pawn is worth advancing as long as it stays a win, and the King is worth advancing ahead of it, while
+            # every position stays below those with a Queen so promoting is always progress
+            progress = -(piece // 8) - 0.5 * (strong_king // 8)
+        else:
+            # checkmate needs the lone King driven to the edge with the other King close by
+            manhattan_distance = abs(strong_king // 8 - weak_king // 8) + abs(strong_king % 8 - weak_king % 8)
+            progress = 0.47 * _center_distance(weak_king) + 0.16 * (14 - manhattan_distance)
+        score = BITBASE_WIN_SCORE + progress
+        return -score if black_to_move else score
+
+
+def _center_distance(square: int) -> int:
+    """
+    Returns how many rows and columns the given square is away from the four center squares.
+    """
+    row, col = divmod(square, 8)
+    return max(3 - row, row - 4) + max(3 - col, col - 4)
+
+
+def _king_distance(square: int, other_square: int) -> int:
+    """
+    Returns how many King moves apart two squares are.
+    """
+    return max(abs(square // 8 - other_square // 8), abs(square % 8 - other_square % 8))
+
+
+def generate_bitbases(directory: str = BITBASE_DIRECTORY) -> None:
+    """
+    Generates every bitbase missing from the given directory. The bitbases already there are reused to generate the
+    Pawn's.
+    """
+    bitbases = {}
+    for name, piece_type in BITBASE_PIECES.items():
+        path = os.path.join(directory, f"{name}.bin")
+        if os.path.isfile(path):
+            bitbases[piece_type] = np.unpackbits(np.fromfile(path, dtype=np.uint8)).astype(bool)
+            continue
+        start_time = time.perf_counter()
+        promotion_bitbases = [bitbases[QUEEN], bitbases[ROOK]] if piece_type == PAWN else []
+        bitbases[piece_type] = generate_bitbase(piece_type, promotion_bitbases)
+        os.makedirs(directory, exist_ok=True)
+        np.packbits(bitbases[piece_type]).tofile(path)
+        logger.info("generated the %s bitbase in %.1fs", name.upper(), time.perf_counter() - start_time)
+
+
+def load_bitbases(directory: str = BITBASE_DIRECTORY) -> Bitbases:
+    """
+    Loads the bitbases from the given directory, or returns None if none have been generated there.
+    """
+    bitbases = Bitbases(directory)
+    if not bitbases.bitbases:
+        return None
+    return bitbases
+
+
+def verify_bitbases(bitbases: Bitbases, sample_count: int, plies: int, seed: int) -> bool:
+    """
+    Checks random positions of every bitbase, with either side as the stronger one, against an oracle built on the
+    chess package rather than the move generator or the retrograde analysis. Positions the oracle can't decide within
+    the given amount of plies are skipped. Returns false if any decided position doesn't match.
+    """
+    import chess
+
+    from engine.game_state import GameState
+
+    generator = random.Random(seed)
+    mismatches = 0
+    for name, piece_type in BITBASE_PIECES.items():
+        checked = 0
+        undecided = 0
+        wins = 0
+        known = {}
+        while checked < sample_count:
+            strong_king, weak_king, piece = generator.sample(range(64), 3)
+            if piece_type == PAWN and piece // 8 in (0, 7):
+                continue
+            letter = "P" if piece_type == PAWN else "R" if piece_type == ROOK else "Q"
+            placement = {strong_king: "K", weak_king: "k", piece: letter}
+            strong = generator.choice([WHITE, BLACK])
+            if strong == BLACK:
+                # the position is mirrored with the colours swapped, so the Pawn still moves towards the lone King
+                placement = {square ^ 56: letter.swapcase() for square, letter in placement.items()}
+            turn = generator.choice("wb")
+            fen = _placement_fen(placement, turn)
+            board = chess.Board(fen)
+            if _king_distance(strong_king, weak_king) <= 1 or not board.is_valid():
+                continue
+
+            expected_win = _oracle_win(board, chess.WHITE if strong == WHITE else chess.BLACK, plies, known)
+            checked += 1
+            if expected_win is None:
+                undecided += 1
+                continue
+            is_win = bitbases.probe(GameState(fen)) != 0
+            wins += is_win
+            if is_win != expected_win:
+                mismatches += 1
+                print(f"mismatch in {fen}: bitbase {'win' if is_win else 'draw'}")
+        print(f"{name.upper()}: {checked} positions checked, {undecided} undecided, {wins} won")
+    print(f"{mismatches} mismatches")
+    return mismatches == 0
+
+
+def _oracle_win(board: object, strong: bool, plies: int, known: dict) -> bool:
+    """
+    Decides whether the stronger side wins the position on the chess package's board, by searching every line until
+    the Pawn promotes or is taken, or the given amount of plies runs out, in which case it returns None. Positions of a
+    King and a Queen or Rook against a lone King are won unless the lone King is stalemated or can take the piece,
+    which is known from theory. Decided positions are remembered in the dictionary given as an argument, and undecided
+    ones with the amount of plies they were searched to.
+    """
+    import chess
+
+    # the pieces of each type and colour and the player to move are all a position of these endgames is
+    key = (
+        board.turn,
+        board.occupied_co[chess.WHITE],
+        board.kings,
+        board.pawns,
+        board.knights | board.bishops,
+        board.rooks,
+        board.queens,
+    )
+    result = known.get(key)
+    if result is not None and (isinstance(result, bool) or result >= plies):
+        return result if isinstance(result, bool) else None
+
+    moves = list(board.legal_moves)
+    if not moves:
+        # checkmate or stalemate
+        result = board.is_check() and board.turn != strong
+    elif board.is_insufficient_material():
+        result = False
+    elif not board.pawns:
+        result = board.turn == strong or not any(board.is_capture(move) for move in moves)
+    elif plies == 0:
+        result = None
+    else:
+        # the side to move picks its best outcome, which is only undecided if nothing better is decided
+        best = board.turn == strong
+        result = not best
+        for move in moves:
+            board.push(move)
+            outcome = _oracle_win(board, strong, plies - 1, known)
+            board.pop()
+            if outcome == best:
+                result = best
+                break
+            if outcome is None:
+                result = None
+
+    known[key] = plies if result is None else result
+    return result
+
+
+def _placement_fen(placement: dict, turn: str) -> str:
+    """
+    Builds a FEN from a dictionary of square indices to piece letters.
+    """
+    rows = []
+    for row in range(8):
+        fen_row = ""
+        empty = 0
+        for col in range(8):
+            letter = placement.get(row * 8 + col)
+            if letter is None:
+                empty += 1
+                continue
+            if empty:
+                fen_row += str(empty)
+                empty = 0
+            fen_row += letter
+        rows.append(fen_row + (str(empty) if empty else ""))
+    return "/".join(rows) + f" {turn} - - 0 1"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generates and verifies the endgame bitbases.")
+    parser.add_argument("command", choices=["generate", "verify"])
+    parser.add_argument("samples", type=int, nargs="?", default=100, help="positions checked of every bitbase")
+    parser.add_argument("--plies", type=int, default=12, help="plies the oracle searches a Pawn ending to")
+    parser.add_argument("--directory", default=BITBASE_DIRECTORY)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    if args.command == "generate":
+        generate_bitbases(args.directory)
+    else:
+        bitbases = load_bitbases(args.directory)
+        if bitbases is None:
+            sys.exit(f"no bitbases in {args.directory}, generate them first")
+        sys.exit(0 if verify_bitbases(bitbases, args.samples, args.plies, args.seed) else 1)
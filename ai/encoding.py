@@ -0,0 +1,197 @@
+"""
+Encodes positions into the binary input of the deep learning model, which has one bit for each of the 12 piece types on
+each of the 64 squares. The search encodes positions straight from their bitboards, while the conversion through
+Forsyth-Edwards Notation is kept as the reference the direct encoding is verified against.
+
+Usage, from the root of the repository:
+    python -m ai.encoding 1000
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from constants import *
+
+INPUT_SIZE = 768  # Length of the model's binary input
+
+
+class BoardEncoder:
+    """
+    Encodes the piece bitboards of positions into the model's input, reusing the same preallocated buffers for every
+    encoding rather than allocating new arrays each time. The buffers grow if more positions are encoded at once than
+    they can hold.
+    """
+
+    def __init__(self, max_positions: int = 256) -> None:
+        self._allocate(max_positions)
+
+    def encode(self, bitboards: list) -> np.ndarray:
+        """
+        Encodes a list of positions, each given as its 12 piece bitboards, into one row of the model's input per
+        position. The rows returned are a view of the encoder's buffer, so they are overwritten by the next encoding.
+        """
+        count = len(bitboards)
+        if count > len(self.buffer):
+            self._allocate(max(count, 2 * len(self.buffer)))
+
+        self.bitboards[:count] = bitboards
+        # viewing the bitboards as little endian bytes puts square 0 first, followed by the rest of the squares in order
+        bits = np.unpackbits(self.bitboards[:count].view(np.uint8), bitorder="little")
+        binary = self.buffer[:count]
+        # the bits are converted to floats as they are copied into the buffer, rather than into a new array
+        np.copyto(binary.reshape(-1), bits)
+        return binary
+
+    def _allocate(self, max_positions: int) -> None:
+        """
+        Allocates buffers large enough to encode the given amount of positions at once.
+        """
+        self.bitboards = np.zeros((max_positions, 12), dtype="<u8")
+        self.buffer = np.zeros((max_positions, INPUT_SIZE), dtype=np.float32)
+
+
+def forsyth_edwards_conversion(game_state: object) -> str:
+    """
+    Converts the current game state to the Forsyth-Edwards Chess Notation.
+    https://en.wikipedia.org/wiki/Forsyth%E2%80%93Edwards_Notation
+    """
+    algebraic_notation_map = {
+        "w_pawn": "P",
+        "b_pawn": "p",
+        "w_rook": "R",
+        "b_rook": "r",
+        "w_knight": "N",
+        "b_knight": "n",
+        "w_bishop": "B",
+        "b_bishop": "b",
+        "w_queen": "Q",
+        "b_queen": "q",
+        "w_king": "K",
+        "b_king": "k",
+    }
+
+    fen = ""
+    for row in np.arange(GRID_DIMENSION):
+        blank_square_count = 0
+        for col in np.arange(GRID_DIMENSION):
+            piece = game_state.board[row][col]
+            if not piece:
+                blank_square_count += 1
+                if col == 7:
+                    fen += str(blank_square_count)
+
+            else:
+                if blank_square_count > 0:
+                    fen += str(blank_square_count)
+                    blank_square_count = 0
+                fen += algebraic_notation_map[piece.image_code]
+        if row < 7:
+            fen += "/"
+
+    # active color
+    if game_state.turn == WHITE:
+        fen += " w "
+    else:
+        fen += " b "
+
+    # castling availibility (castling is not implemented)
+    fen += "- "
+
+    # en passant target square (en passant is not implemented)
+    fen += "- "
+
+    # halfmove clock (does not need to be calculated since this function is only called by the AI)
+    fen += "0 "
+
+    # fullmove clock
+    fen += str(len(game_state.move_log) // 2)
+    return fen
+
+
+def fen_to_binary_encoding(fen: str) -> float:
+    """
+    Converts a string in Forsyth-Edwards Chess Notation into binary encoding (length of 768) which is readable by the deep learning model.
+    """
+    # the chess package is only needed here, so it isn't imported by the search which never converts to FEN
+    import chess
+
+    # get the bitboards for each team from the board
+    board = chess.Board(fen)
+    black_squares, white_squares = board.occupied_co
+
+    # Create the bitboards for each individual type of chess piece per team
+    b_pawn_bitboard = black_squares & board.pawns
+    b_knight_bitboard = black_squares & board.knights
+    b_bishop_bitboard = black_squares & board.bishops
+    b_rook_bitboard = black_squares & board.rooks
+    b_queen_bitboard = black_squares & board.queens
+    b_king_bitboard = black_squares & board.kings
+    w_pawn_bitboard = white_squares & board.pawns
+    w_knight_bitboard = white_squares & board.knights
+    w_bishop_bitboard = white_squares & board.bishops
+    w_rook_bitboard = white_squares & board.rooks
+    w_queen_bitboard = white_squares & board.queens
+    w_king_bitboard = white_squares & board.kings
+
+    # Combine the bitboards for each chess piece into a single array
+    bitboards = np.array(
+        [
+            b_pawn_bitboard,
+            b_knight_bitboard,
+            b_bishop_bitboard,
+            b_rook_bitboard,
+            b_queen_bitboard,
+            b_king_bitboard,
+            w_pawn_bitboard,
+            w_knight_bitboard,
+            w_bishop_bitboard,
+            w_rook_bitboard,
+            w_queen_bitboard,
+            w_king_bitboard,
+        ],
+        dtype=np.uint64,
+    )
+
+    # add a new dimension to the bitboards array to make bitwise operations simpler for conversion into binary
+    bitboards = np.asarray(bitboards, dtype=np.uint64)[:, np.newaxis]
+    shift_amounts = GRID_DIMENSION * np.arange(
+        GRID_DIMENSION - 1, -1, -1, dtype=np.uint64
+    )
+    # shift the bits in the bitboards array by the shift amounts and convert to uint8 data type
+    binary = (bitboards >> shift_amounts).astype(np.uint8)
+    # converts the binary values to a 1D array of individual bits
+    binary = np.unpackbits(binary, bitorder="little")
+    # returns a float data type to be used by the deep learning model
+    return binary.astype(np.float32)
+
+
+def verify_encoding(game_count: int, seed: int) -> bool:
+    """
+    Plays random games and checks that the direct encoding of every position reached is bit-identical to the encoding
+    through Forsyth-Edwards Notation. Returns false if any position differs.
+    """
+    from engine.random_games import random_games
+
+    encoder = BoardEncoder()
+    positions = 0
+    mismatches = 0
+    for game_state, legal_moves in random_games(game_count, seed):
+        expected = fen_to_binary_encoding(forsyth_edwards_conversion(game_state))
+        binary = encoder.encode([game_state.position.bitboards])[0]
+        positions += 1
+        if not np.array_equal(binary, expected):
+            mismatches += 1
+            print(f"MISMATCH: {forsyth_edwards_conversion(game_state)}")
+
+    print(f"{positions} positions from {game_count} random games, {mismatches} mismatches")
+    return mismatches == 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Verifies the direct encoding against the encoding through FEN.")
+    parser.add_argument("games", type=int, help="amount of random games to play")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.exit(0 if verify_encoding(args.games, args.seed) else 1)
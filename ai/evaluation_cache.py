@@ -0,0 +1,10 @@
+from engine.lru_cache import LRUCache
+
+
+class EvaluationCache(LRUCache):
+    """
+    Remembers the model's score of recently evaluated positions, keyed by their Zobrist key, so positions scored again
+    within a search or in a later one skip the model entirely. The key includes the player to move, so the same
+    placement of pieces with a different player to move is scored separately. Once the cache holds its maximum amount of
+    entries the least recently used entry is evicted.
+    """
@@ -0,0 +1,176 @@
+"""
+The deep learning model which evaluates positions, and the backends it can be run with on the CPU. Besides running the
+model as it was trained, its linear layers can be dynamically quantized, storing their weights as 8 bit integers and
+quantizing their inputs on the fly, which makes a forward pass several times cheaper on a single core. Either backend
+can also be compiled with TorchScript, by scripting or by tracing, to skip Python's overhead between the layers. The
+backend the AI uses is chosen by MODEL_BACKEND in constants.py, which defaults to the NumPy model in ai/numpy_model.py.
+
+Usage, from the root of the repository:
+    python -m ai.model --batch-sizes 1 8 32 256 --threads 1
+"""
+
+import argparse
+import itertools
+import time
+import warnings
+
+import torch
+from torch import nn
+import pytorch_lightning as pl
+from collections import OrderedDict
+
+MODEL_PATH = "model/chkpt.pt"
+MODEL_JIT = None  # "script" or "trace" compiles the model with TorchScript, None runs it eagerly
+MODEL_THREADS = None  # threads each forward pass may use, None leaves the choice to torch
+
+
+class BoardEvaluationModel(pl.LightningModule):
+    def __init__(
+        self, learning_rate=1e-3, batch_size=1024, layer_count=10, binary_input_size=768
+    ):
+        super().__init__()
+        self.batch_size = batch_size
+        self.learning_rate = learning_rate
+        self.binary_input_size = binary_input_size
+        layers = []
+        for i in range(layer_count - 1):
+            layers.append(
+                (f"linear-{i}", nn.Linear(binary_input_size, binary_input_size))
+            )
+            layers.append((f"relu-{i}", nn.ReLU()))
+        layers.append((f"linear-{layer_count - 1}", nn.Linear(binary_input_size, 1)))
+        self.seq = nn.Sequential(OrderedDict(layers))
+
+    def forward(self, input_board_state):
+        return self.seq(input_board_state)
+
+
+def quantize_model(model: object) -> object:
+    """
+    Dynamically quantizes the linear layers of the model given as an argument to 8 bit integers. The weights are
+    quantized once, while the inputs of every layer are quantized by the range of values in each batch.
+    """
+    with warnings.catch_warnings():
+        # newer versions of torch deprecate torch.ao.quantization in favour of a separate package
+        warnings.simplefilter("ignore")
+        return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+
+def compile_model(model: object, jit: str) -> object:
+    """
+    Compiles the layers of the model given as an argument with TorchScript, either by scripting or by tracing them with
+    an empty board. The layers are compiled rather than the whole LightningModule, so the compiled model's weights keep
+    the names of the layers.
+    """
+    with warnings.catch_warnings():
+        # newer versions of torch deprecate TorchScript in favour of torch.compile, which needs a compiler toolchain
+        warnings.simplefilter("ignore")
+        if jit == "script":
+            return torch.jit.script(model.seq)
+        if jit == "trace":
+            with torch.no_grad():
+                return torch.jit.trace(model.seq, torch.zeros(1, model.binary_input_size))
+    raise ValueError(f"unknown TorchScript compilation {jit!r}, expected 'script' or 'trace'")
+
+
+def load_model(
+    path: str = MODEL_PATH, backend: str = "float", jit: str = MODEL_JIT, threads: int = MODEL_THREADS
+) -> object:
+    """
+    Loads the trained deep learning model used to evaluate positions from its checkpoint, either as trained ("float") or
+    with its linear layers quantized to 8 bit integers ("int8"), and compiled according to the TorchScript compilation
+    given as an argument. Setting the threads applies to every forward pass of the process, not only this model's.
+    """
+    if threads is not None:
+        torch.set_num_threads(threads)
+    model = BoardEvaluationModel(layer_count=2, batch_size=1024, learning_rate=1e-3)
+    model.load_state_dict(torch.load(path))
+    model.eval()
+    # the model is only ever evaluated, so no forward pass needs to keep track of gradients
+    model.requires_grad_(False)
+    if backend == "int8":
+        model = quantize_model(model)
+    elif backend != "float":
+        raise ValueError(f"unknown model backend {backend!r}, expected 'float' or 'int8'")
+    if jit is not None:
+        model = compile_model(model, jit)
+    return model
+
+
+def random_positions(position_count: int, seed: int) -> tuple:
+    """
+    Plays random games until the given amount of positions is reached, returning the bitboards of every position and
+    the bitboards of the positions after each of its legal moves, along with the player to move.
+    """
+    from engine.random_games import random_games
+
+    positions = []
+    children = []
+    for game_state, legal_moves in itertools.islice(random_games(None, seed), position_count):
+        positions.append(list(game_state.position.bitboards))
+        children.append((game_state.turn, [game_state.bitboards_after_move(move) for move in legal_moves]))
+    return positions, children
+
+
+def benchmark_backends(
+    path: str, batch_sizes: list, position_count: int, repeats: int, threads: int, seed: int
+) -> None:
+    """
+    Measures the latency of a forward pass of every backend, eager and compiled, at each batch size given as an argument,
+    and how far the scores of each drift from the float model's over the positions of random games. Drift is given as
+    the largest and mean difference in score, and as how often the best move by the scores of the positions after every
+    legal move is the same as the float model's.
+    """
+    from constants import WHITE
+    from ai.encoding import BoardEncoder
+
+    torch.set_grad_enabled(False)
+    positions, children = random_positions(position_count, seed)
+    encoder = BoardEncoder()
+    inputs = torch.from_numpy(encoder.encode(positions).copy())
+    child_inputs = [(turn, torch.from_numpy(encoder.encode(bitboards).copy())) for turn, bitboards in children]
+    batches = {
+        batch_size: torch.from_numpy(encoder.encode([positions[i % len(positions)] for i in range(batch_size)]).copy())
+        for batch_size in batch_sizes
+    }
+
+    reference = None
+    for backend in ("float", "int8"):
+        for jit in (None, "script", "trace"):
+            model = load_model(path, backend, jit, threads)
+            latencies = []
+            for batch_size, batch in batches.items():
+                for _ in range(3):
+                    model(batch)
+                start_time = time.perf_counter()
+                for _ in range(repeats):
+                    model(batch)
+                latencies.append(f"{batch_size}: {1e6 * (time.perf_counter() - start_time) / repeats:.0f}us")
+
+            scores = model(inputs).flatten()
+            # the player to move picks the position after their move which is best for them
+            best_children = [
+                int(model(batch).flatten().argmax() if turn == WHITE else model(batch).flatten().argmin())
+                for turn, batch in child_inputs
+            ]
+            if reference is None:
+                reference = scores, best_children
+            drift = (scores - reference[0]).abs()
+            agreement = sum(best == expected for best, expected in zip(best_children, reference[1])) / len(best_children)
+            print(
+                f"{backend} {jit or 'eager'}: {', '.join(latencies)}, drift max {drift.max():.4f} mean "
+                f"{drift.mean():.4f}, best move agreement {100 * agreement:.1f}%"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Latency and drift of the model's CPU backends.")
+    parser.add_argument("--model", default=MODEL_PATH)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 256])
+    parser.add_argument("--positions", type=int, default=1000, help="positions of random games the drift is measured on")
+    parser.add_argument("--repeats", type=int, default=200, help="forward passes timed at each batch size")
+    parser.add_argument("--threads", type=int, default=MODEL_THREADS, help="threads each forward pass may use")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    benchmark_backends(args.model, args.batch_sizes, args.positions, args.repeats, args.threads, args.seed)
@@ -0,0 +1,119 @@
+"""
+Alpha-beta search prunes the most when the best move of a position is searched first. Without knowing the best move,
+it is guessed: the hash move from the transposition table, then captures of the most valuable victim by the least
+valuable attacker (MVV-LVA), then quiet moves which caused a cutoff at the same ply (killer moves), then the remaining
+quiet moves by how often they caused cutoffs anywhere in the search (the history heuristic).
+"""
+
+import random
+
+from constants import *
+from engine.movement import move_start, move_end, move_promotion, move_is_capture
+
+# only the relative order of the values matters, a king is never captured so its value only makes it the last attacker
+PIECE_ORDER_VALUES = {PAWN: 1, KNIGHT: 2, BISHOP: 3, ROOK: 4, QUEEN: 5, KING: 6}
+
+KILLER_SLOTS = 2  # Amount of killer moves remembered for each ply
+
+
+class MoveOrdering:
+    """
+    Holds the killer moves and history table of one search, which are learned from the cutoffs found while searching.
+    """
+
+    def __init__(self) -> None:
+        self.killers = []
+        # indexed by the start and end square of a move, separately for each team
+        self.history = {WHITE: [0] * 4096, BLACK: [0] * 4096}
+
+    def record_cutoff(self, move: int, team: str, ply: int, depth: int) -> None:
+        """
+        Remembers a quiet move which caused a beta cutoff as a killer move of its ply, and rewards it in the history
+        table. Moves causing cutoffs far from the leaves prune more, so they are rewarded more.
+        """
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[KILLER_SLOTS:]
+        self.history[team][move & 4095] += depth * depth
+
+    def order_moves(self, position: object, moves: list, hash_move: int, team: str, ply: int) -> list:
+        """
+        Returns the moves given as an argument sorted into the order they should be searched in.
+        """
+        captures = []
+        quiet_moves = []
+        for move in moves:
+            if move == hash_move:
+                continue
+            if move_is_capture(move) or move_promotion(move):
+                captures.append(move)
+            else:
+                quiet_moves.append(move)
+
+        ordered_moves = [hash_move] if hash_move in moves else []
+        ordered_moves += self.order_captures(position, captures)
+        ordered_moves += self.order_quiet_moves(quiet_moves, team, ply)
+        return ordered_moves
+
+    def order_staged_moves(self, game_state: object, hash_move: int, ply: int):
+        """
+        Lazily yields the legal moves of the game state in the order they should be searched in. The hash move is
+        yielded before any other move is generated, and the quiet moves are only generated once every capture has been
+        searched.
+        """
+        staged_moves = game_state.generate_staged_moves(hash_move)
+        captures = []
+        quiet_moves = []
+        for move in staged_moves:
+            if move == hash_move:
+                yield move
+            elif move_is_capture(move) or move_promotion(move):
+                captures.append(move)
+            else:
+                # the staged moves only reach the quiet moves once every capture and promotion has been generated
+                quiet_moves.append(move)
+                break
+
+        yield from self.order_captures(game_state.position, captures)
+        quiet_moves.extend(staged_moves)
+        yield from self.order_quiet_moves(quiet_moves, game_state.turn, ply)
+
+    def order_captures(self, position: object, captures: list) -> list:
+        """
+        Sorts captures and promotions by the value of the piece captured, then by the value of the piece capturing it.
+        Promotions count the piece promoted to as captured.
+        """
+        # shuffling first leaves moves of equal value in a random order, since sorting keeps their order
+        random.shuffle(captures)
+
+        def capture_value(move: int) -> int:
+            value = -PIECE_ORDER_VALUES[position.piece_at(move_start(move)).type]
+            if move_is_capture(move):
+                value += 8 * PIECE_ORDER_VALUES[position.piece_at(move_end(move)).type]
+            promotion = move_promotion(move)
+            if promotion:
+                value += 8 * PIECE_ORDER_VALUES[promotion]
+            return value
+
+        captures.sort(key=capture_value, reverse=True)
+        return captures
+
+    def order_quiet_moves(self, quiet_moves: list, team: str, ply: int) -> list:
+        """
+        Sorts quiet moves with the killer moves of the ply first, followed by the rest of the moves by their history.
+        """
+        random.shuffle(quiet_moves)
+        killers = self.killers[ply] if ply < len(self.killers) else []
+        history = self.history[team]
+
+        def quiet_value(move: int) -> int:
+            if move in killers:
+                # killers always come before the other moves, the most recent killer first
+                return 1 << (62 - killers.index(move))
+            return history[move & 4095]
+
+        quiet_moves.sort(key=quiet_value, reverse=True)
+        return quiet_moves
@@ -1,11 +1,108 @@
+import itertools
+import logging
 import numpy as np
-import chess.engine
 import random
 import math
+import time
 from constants import *
-import torch
+from engine.bitboard import PIECE_INDEX
+from engine.movement import move_notation, move_is_capture, move_promotion, NULL_MOVE
+from ai.accumulator import Accumulator
+from ai.bitbase import load_bitbases
+from ai.encoding import BoardEncoder
+from ai.evaluation_cache import EvaluationCache
+from ai.move_ordering import MoveOrdering
+from ai.numpy_model import NumpyModel
+from ai.opening_book import load_opening_book
+from ai.transposition import TranspositionTable, EXACT, LOWER_BOUND, UPPER_BOUND
 
-MAX_DEPTH = 2
+MAX_DEPTH = 64  # deepest iteration of the iterative deepening search
+SEARCH_TIME_LIMIT = 2.0  # seconds the AI may spend searching for each move
+SEARCH_NODE_LIMIT = None  # nodes the AI may search for each move, unlimited if None
+QUIESCENCE_DEPTH = 4  # longest sequence of captures searched past the end of the main search
+# score positions with an incrementally updated accumulator rather than the whole model, which needs the float weights
+USE_ACCUMULATOR = MODEL_BACKEND != "int8"
+USE_PVS = True  # search every move after the first with a null window, only searching it fully if it is better
+USE_NULL_MOVE = True  # prune positions still causing a cutoff after passing the turn to the opponent
+USE_LATE_MOVE_REDUCTIONS = True  # search quiet moves late in the move order less deeply unless they turn out better
+NULL_WINDOW = 1e-3  # width of the window a move is searched with to only find out if it is better than alpha
+NULL_MOVE_REDUCTION = 2  # how much shallower the position after passing the turn is searched
+LATE_MOVE_REDUCTION_MOVES = 3  # moves searched at full depth before the remaining quiet moves are reduced
+LATE_MOVE_REDUCTION_DEPTH = 3  # shallowest remaining depth at which moves are reduced
+LEAF_BATCH_GROWTH = 4  # how many times more leaves each batch scored together holds than the one before
+
+# kept between calls so positions searched while finding one move are remembered when finding the next
+TRANSPOSITION_TABLE = TranspositionTable(TRANSPOSITION_TABLE_SIZE_MB)
+
+# kept between calls so positions scored while finding one move don't need scoring again when finding the next
+EVALUATION_CACHE = EvaluationCache(EVALUATION_CACHE_SIZE)
+
+# reused by every evaluation so the model's input is never reallocated
+BOARD_ENCODER = BoardEncoder()
+
+# memory-mapped once generated with python -m ai.bitbase generate, None until then
+BITBASES = load_bitbases()
+
+# memory-mapped, so the book isn't read into memory beyond the positions looked up in it, None if there is no book
+OPENING_BOOK = load_opening_book()
+
+logger = logging.getLogger(__name__)
+
+
+class SearchInterrupted(Exception):
+    """
+    Raised from inside the search once it runs out of time or nodes, abandoning the iteration in progress.
+    """
+
+
+class SearchContext:
+    """
+    Holds the state shared by every node of one search, which is the transposition table, the killer moves and history
+    used to order moves, how deep the quiescence search goes, the cache of scored positions, which pruning techniques
+    are used, the endgame bitbases, the amount of nodes searched and the limits the search has to stop at. A search of
+    only some of the root moves mustn't store the root's result, which wouldn't hold for the whole position.
+    """
+
+    def __init__(
+        self,
+        transposition_table=None,
+        time_limit: float = None,
+        node_limit: int = None,
+        use_move_ordering: bool = True,
+        quiescence_depth: int = QUIESCENCE_DEPTH,
+        evaluation_cache=None,
+        use_pvs: bool = USE_PVS,
+        use_null_move: bool = USE_NULL_MOVE,
+        use_late_move_reductions: bool = USE_LATE_MOVE_REDUCTIONS,
+        bitbases=None,
+        store_root: bool = True,
+    ) -> None:
+        self.transposition_table = transposition_table
+        self.store_root = store_root
+        self.bitbases = bitbases
+        self.use_pvs = use_pvs
+        self.use_null_move = use_null_move
+        self.use_late_move_reductions = use_late_move_reductions
+        self.move_ordering = MoveOrdering() if use_move_ordering else None
+        self.quiescence_depth = quiescence_depth
+        self.evaluation_cache = evaluation_cache
+        self.deadline = None if time_limit is None else time.perf_counter() + time_limit
+        self.node_limit = node_limit
+        self.nodes = 0
+        self.completed_depth = 0
+
+    def count_node(self) -> None:
+        """
+        Counts a searched node, interrupting the search if it has run out of time or nodes. The first iteration is
+        always completed so there is a move to return.
+        """
+        self.nodes += 1
+        if self.completed_depth == 0:
+            return
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchInterrupted
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise SearchInterrupted
 
 
 def find_random_move(legal_moves: list) -> object:
@@ -18,16 +115,145 @@ def find_random_move(legal_moves: list) -> object:
         return legal_moves[random_index]
 
 
-def find_best_move(model, game_state: object, legal_moves: list):
+def find_best_move(
+    model,
+    game_state: object,
+    legal_moves: list,
+    time_limit: float = SEARCH_TIME_LIMIT,
+    node_limit: int = SEARCH_NODE_LIMIT,
+    max_depth: int = MAX_DEPTH,
+    transposition_table=TRANSPOSITION_TABLE,
+    use_accumulator: bool = USE_ACCUMULATOR,
+    evaluation_cache=EVALUATION_CACHE,
+    opening_book=OPENING_BOOK,
+    bitbases=BITBASES,
+):
     """
-    Calculates the best move the AI could make in the next turn.
+    Calculates the best move the AI could make in the next turn. The search is iteratively deepened one move at a time until it runs out of time or nodes, and the best move of the last completed depth is returned. Each iteration searches the best moves found by the previous one first, which are remembered by the transposition table.
+
+    Positions found in the opening book given as an argument are answered with a book move instead of searching. Endgames found in the bitbases given as an argument are scored exactly rather than searched.
     """
     # shuffle the move list to randomize which move the AI will make in the case there are multiple moves with the same score
     np.random.shuffle(legal_moves)
-    _, move = ab_negamax(
-        model, game_state, legal_moves, MAX_DEPTH, 0, -math.inf, math.inf
+    if len(legal_moves) <= 1:
+        return legal_moves[0] if legal_moves else None
+
+    if opening_book is not None:
+        move = opening_book.find_move(game_state, legal_moves)
+        if move is not None:
+            logger.info("book move %s", move_notation(move))
+            return move
+
+    transposition_table.new_search()
+    search = SearchContext(
+        transposition_table,
+        time_limit,
+        node_limit,
+        evaluation_cache=evaluation_cache,
+        bitbases=bitbases,
+    )
+    iterations = iterative_deepening(
+        model, game_state, legal_moves, search, max_depth, use_accumulator
     )
-    return move
+
+    if evaluation_cache is not None and logger.isEnabledFor(logging.INFO):
+        stats = evaluation_cache.stats()
+        logger.info(
+            "evaluation cache hit rate %.1f%% (%d hits, %d misses), %d of %d entries used",
+            100 * stats["hit_rate"],
+            stats["hits"],
+            stats["misses"],
+            stats["size"],
+            stats["max_entries"],
+        )
+    # the best move of the last completed depth
+    return iterations[-1][1] if iterations else None
+
+
+def iterative_deepening(
+    model,
+    game_state: object,
+    legal_moves: list,
+    search: SearchContext,
+    max_depth: int,
+    use_accumulator: bool,
+) -> list:
+    """
+    Searches the root moves given as an argument one move deeper at a time, until the search context runs out of time or nodes or the maximum depth is reached. Returns the score and best move of every completed depth, the interrupted depth is discarded. The root moves are reordered to put the best move first after every depth.
+
+    With the accumulator enabled, positions are scored from the model's first layer output kept up to date by every move, instead of by a forward pass of the whole model.
+    """
+    transposition_table = search.transposition_table
+    root_ply = len(game_state.move_log)
+    iterations = []
+    if use_accumulator:
+        # the accumulator follows every move the search makes, so scoring a position skips most of the model
+        game_state.set_accumulator(Accumulator.from_model(model))
+    try:
+        for depth in range(1, max_depth + 1):
+            try:
+                score, move = ab_negamax(
+                    model,
+                    game_state,
+                    legal_moves,
+                    depth,
+                    0,
+                    -math.inf,
+                    math.inf,
+                    search,
+                )
+            except SearchInterrupted:
+                # the interrupted iteration leaves its moves made, they are undone to restore the position
+                while len(game_state.move_log) > root_ply:
+                    game_state.undo_move()
+                break
+
+            search.completed_depth = depth
+            # when every move loses to checkmate no move is better than another, so the previous best move is kept
+            if move is None:
+                move = iterations[-1][1] if iterations else legal_moves[0]
+            legal_moves.remove(move)
+            legal_moves.insert(0, move)
+            iterations.append((score, move))
+
+            # walking the principal variation makes and undoes its moves, so it is skipped unless it is logged
+            if logger.isEnabledFor(logging.INFO):
+                stats = transposition_table.stats()
+                logger.info(
+                    "depth %d, score %.3f, %d nodes, transposition table hit rate %.1f%%, pv %s",
+                    depth,
+                    score,
+                    search.nodes,
+                    100 * stats["hit_rate"],
+                    " ".join(
+                        move_notation(move)
+                        for move in principal_variation(game_state, transposition_table, depth)
+                    ),
+                )
+            # a forced checkmate for either side won't change by searching deeper
+            if is_mate_score(score):
+                break
+    finally:
+        if use_accumulator:
+            game_state.set_accumulator(None)
+    return iterations
+
+
+def principal_variation(game_state: object, transposition_table, max_length: int) -> list:
+    """
+    Follows the best moves stored in the transposition table from the current position, giving the line of play the search expects.
+    """
+    variation = []
+    while len(variation) < max_length:
+        move = transposition_table.best_move(game_state.zobrist_key)
+        # a slot may have been taken over by another position, so the move is only followed if it is legal
+        if move is None or move not in game_state.get_legal_moves():
+            break
+        variation.append(move)
+        game_state.execute_move(move)
+    for move in variation:
+        game_state.undo_move()
+    return variation
 
 
 def ab_negamax(
@@ -38,34 +264,172 @@ def ab_negamax(
     current_depth,
     alpha,
     beta,
+    search=None,
+    stand_pat=None,
 ):
     """
     The Negamax algorithm is a variant on the minmax algorithm which calculates the best possible move a player could make to maximize their own position and minimize that of their opponments. Negamax simplifies this in the case of a two-player zero-sum game by using a singular score to represent the balance of power within the game. In chess, it usually means a positive score signifies a strong position for White and a negative score a strong position for Black.
 
     Alpha signifies the minimum score that the current player can be assured to achieve and the Beta is the maximum score that the opponent can be assured to achieve. To increase efficiency we can automatically discard all branches of the game in which Beta < Alpha, because we can reasonably assume the opponent will never make such a move.
+
+    The search context given as an argument counts the nodes searched and stops the search once it runs out of time or nodes. The results of searched positions are stored in its transposition table. When the same position is reached again and was already searched at least as deeply, its stored score is reused if it is exact or a bound that causes a cutoff. Otherwise the stored best move is searched first. A checkmate scores MATE_SCORE less the amount of moves from the root until it happens, so the search prefers the quickest checkmate and the slowest way to be checkmated.
+
+    Endgames of a King and a Queen, Rook or Pawn against a lone King are looked up in the search context's bitbases, anywhere but the root. Drawn positions and the leaves are scored by the bitbases instead of being searched or scored by the model, while won positions are still searched so the search can find the checkmate.
+
+    When every child of a position is a leaf, the leaves are scored together in batches and their scores are passed down as the stand pat score given as an argument. The first batch only holds the first move, so a cutoff by the hash move or a capture skips scoring, and generating, the moves after it.
+
+    The search context can also switch on three ways of spending less time on moves that are unlikely to be best. With principal variation search (PVS), every move after the first is searched with a null window, which only finds out whether it beats the best move so far, and only moves that do are searched again with the full window. Null-move pruning passes the turn to the opponent and searches the position less deeply, cutting the position off if the opponent still can't get below beta. Late-move reductions search quiet moves late in the move order one move less deeply, searching them again at full depth if they turn out better than the best move so far.
     """
-    base_case = current_depth == max_depth
+    base_case = current_depth >= max_depth
+    bitbase_score = None
+    if search is not None and search.bitbases is not None and current_depth > 0:
+        bitbase_score = search.bitbases.probe(game_state, current_depth)
+        # a drawn or checkmated position is final, while a won one is searched further to find the way to checkmate
+        if bitbase_score is not None and (
+            base_case or bitbase_score == 0 or is_mate_score(bitbase_score)
+        ):
+            return bitbase_score, None
     if base_case:
-        return score_board(model, game_state), None
+        # the leaves are searched further until the captures run out, so they are never scored mid exchange
+        quiescence_depth = QUIESCENCE_DEPTH if search is None else search.quiescence_depth
+        return (
+            quiescence_search(
+                model, game_state, alpha, beta, quiescence_depth, search, stand_pat
+            ),
+            None,
+        )
+
+    transposition_table = None
+    if search is not None:
+        search.count_node()
+        transposition_table = search.transposition_table
+
+    remaining_depth = max_depth - current_depth
+    hash_move = None
+    if transposition_table is not None:
+        entry = transposition_table.probe(game_state.zobrist_key, current_depth)
+        if entry is not None:
+            stored_depth, stored_score, bound, hash_move = entry
+            # the root always searches so it has a move to return
+            if current_depth > 0 and stored_depth >= remaining_depth:
+                if (
+                    bound == EXACT
+                    or (bound == LOWER_BOUND and stored_score >= beta)
+                    or (bound == UPPER_BOUND and stored_score <= alpha)
+                ):
+                    return stored_score, hash_move
+
+    in_check = False
+    if search is not None and current_depth > 0:
+        in_check = game_state.king_in_check()
+
+    # passing the turn is worse than any move except in zugzwang, which mostly happens once a player only has pawns left
+    if (
+        search is not None
+        and search.use_null_move
+        and current_depth > 0
+        and remaining_depth > NULL_MOVE_REDUCTION
+        and not is_mate_score(beta)
+        and not in_check
+        and game_state.move_log[-1] != NULL_MOVE
+        and has_non_pawn_material(game_state)
+    ):
+        game_state.execute_null_move()
+        null_move_score, _ = ab_negamax(
+            model,
+            game_state,
+            None,
+            max_depth - NULL_MOVE_REDUCTION,
+            current_depth + 1,
+            -beta,
+            -beta + NULL_WINDOW,
+            search,
+        )
+        game_state.undo_move()
+        # even a free move for the opponent doesn't save them, so the position is too good for them to allow
+        if -null_move_score >= beta:
+            return beta, None
+
+    # below the root, moves are generated lazily so a cutoff skips generating the rest of them
+    move_ordering = search.move_ordering if search is not None else None
+    if move_ordering is not None:
+        if legal_moves is None:
+            legal_moves = move_ordering.order_staged_moves(
+                game_state, hash_move, current_depth
+            )
+        else:
+            legal_moves = move_ordering.order_moves(
+                game_state.position, legal_moves, hash_move, game_state.turn, current_depth
+            )
+    elif legal_moves is None:
+        legal_moves = game_state.generate_staged_moves(hash_move)
+    elif hash_move in legal_moves:
+        legal_moves.remove(hash_move)
+        legal_moves.insert(0, hash_move)
+
+    evaluation_cache = search.evaluation_cache if search is not None else None
+    if remaining_depth == 1 and bitbase_score is None:
+        # every child is a leaf, so they are scored in a few forward passes of the model instead of one pass each
+        moves = score_leaves(model, game_state, legal_moves, evaluation_cache)
+    else:
+        moves = ((move, None) for move in legal_moves)
 
     # initialize values that will be bubbled up from lower in the search tree
     best_move = None
     best_score = -math.inf
+    move_count = 0
 
-    for move in legal_moves:
-        game_state.execute_move(move)
-        opponents_moves = game_state.get_legal_moves()
-
+    def search_move(depth, move_alpha, move_beta, leaf_score):
         recursed_score, _ = ab_negamax(
             model,
             game_state,
-            opponents_moves,
-            max_depth,
+            None,
+            depth,
             current_depth + 1,
-            -beta,
-            -max(alpha, best_score),
+            -move_beta,
+            -move_alpha,
+            search,
+            leaf_score,
         )
-        current_score = -recursed_score
+        return -recursed_score
+
+    use_pvs = search is not None and search.use_pvs
+    use_late_move_reductions = (
+        search is not None
+        and search.use_late_move_reductions
+        and remaining_depth >= LATE_MOVE_REDUCTION_DEPTH
+        and not in_check
+    )
+    for move, leaf_score in moves:
+        move_count += 1
+        game_state.execute_move(move)
+
+        move_alpha = max(alpha, best_score)
+        # a null window only tells whether the move is better than the best move so far, which is cheaper to find out
+        can_use_null_window = move_count > 1 and not math.isinf(move_alpha)
+        current_score = None
+        if (
+            use_late_move_reductions
+            and can_use_null_window
+            and move_count > LATE_MOVE_REDUCTION_MOVES
+            and not (move_is_capture(move) or move_promotion(move))
+            and not game_state.king_in_check()
+        ):
+            current_score = search_move(
+                max_depth - 1, move_alpha, move_alpha + NULL_WINDOW, leaf_score
+            )
+            # a late move that turns out better than expected is searched again at full depth
+            if current_score > move_alpha:
+                current_score = None
+        if current_score is None and use_pvs and can_use_null_window:
+            current_score = search_move(
+                max_depth, move_alpha, move_alpha + NULL_WINDOW, leaf_score
+            )
+            # a move better than the best move so far needs its exact score, unless it already causes a cutoff
+            if move_alpha < current_score < beta:
+                current_score = None
+        if current_score is None:
+            current_score = search_move(max_depth, move_alpha, beta, leaf_score)
 
         if current_score > best_score:
             best_score = current_score
@@ -74,131 +438,185 @@ def ab_negamax(
 
         # pruning out irrelevant nodes of the search tree to increase efficiency
         if best_score >= beta:
+            if move_ordering is not None and not (
+                move_is_capture(move) or move_promotion(move)
+            ):
+                move_ordering.record_cutoff(
+                    move, game_state.turn, current_depth, remaining_depth
+                )
             break
 
+    # a stalemate is a draw, while a checkmate scores worse the sooner it happens so the quickest checkmate is played
+    if move_count == 0:
+        best_score = 0 if game_state.stalemate else -(MATE_SCORE - current_depth)
+
+    if transposition_table is not None and (current_depth > 0 or search.store_root):
+        if best_score <= alpha:
+            bound = UPPER_BOUND
+        elif best_score >= beta:
+            bound = LOWER_BOUND
+        else:
+            bound = EXACT
+        transposition_table.store(
+            game_state.zobrist_key,
+            remaining_depth,
+            best_score,
+            bound,
+            best_move,
+            current_depth,
+        )
+
     return best_score, best_move
 
 
-def score_board(model, game_state: object) -> float:
+def is_mate_score(score: float) -> bool:
+    """
+    Returns true or false if the score given as an argument is a checkmate for either player, which includes the
+    infinite bounds of a search window.
+    """
+    return abs(score) >= MATE_THRESHOLD
+
+
+def has_non_pawn_material(game_state: object) -> bool:
+    """
+    Returns true or false if the player to move has any pieces left besides their King and Pawns.
+    """
+    bitboards = game_state.position.bitboards
+    return any(
+        bitboards[PIECE_INDEX[(game_state.turn, piece_type)]]
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN)
+    )
+
+
+def quiescence_search(
+    model,
+    game_state: object,
+    alpha: float,
+    beta: float,
+    depth: int,
+    search=None,
+    stand_pat: float = None,
+) -> float:
+    """
+    Searches only the captures and promotions of a position, until none are left or the given depth runs out. The player to move can always choose not to capture, so the score of the position itself (the stand pat score) is a lower bound on its value. If that is already at least beta, none of the captures need searching.
+
+    The stand pat score is scored by the model unless it is given as an argument, which is how the positions reached by every capture are scored together in one batch.
+    """
+    evaluation_cache = None
+    if search is not None:
+        search.count_node()
+        evaluation_cache = search.evaluation_cache
+
+    best_score = stand_pat
+    if best_score is None:
+        best_score = score_board(model, game_state, evaluation_cache)
+    if best_score >= beta or depth == 0:
+        return best_score
+
+    captures = []
+    # the staged moves start with every capture and promotion, so the rest of the moves are never generated
+    for move in game_state.generate_staged_moves():
+        if not (move_is_capture(move) or move_promotion(move)):
+            break
+        captures.append(move)
+    if search is not None and search.move_ordering is not None:
+        captures = search.move_ordering.order_captures(game_state.position, captures)
+    capture_scores = score_boards(model, game_state, captures, evaluation_cache)
+
+    for move, capture_score in zip(captures, capture_scores):
+        game_state.execute_move(move)
+        current_score = -quiescence_search(
+            model,
+            game_state,
+            -beta,
+            -max(alpha, best_score),
+            depth - 1,
+            search,
+            capture_score,
+        )
+        game_state.undo_move()
+
+        if current_score > best_score:
+            best_score = current_score
+            if best_score >= beta:
+                break
+
+    return best_score
+
+
+def evaluate_binary(model, binary: np.ndarray) -> list:
+    """
+    Runs the model on positions encoded one per row of the binary input given as an argument, returning the score of each. Torch is only imported for torch models, so the NumPy model runs without it installed.
     """
-    Gives the current game state on the board a score.
+    if isinstance(model, NumpyModel):
+        return model(binary).flatten().tolist()
+    import torch
+
+    return model(torch.from_numpy(binary)).flatten().tolist()
+
+
+def score_leaves(model, game_state: object, moves, evaluation_cache=None):
+    """
+    Lazily yields each of the moves given as an argument together with the score of the position it leads to, from the point of view of the player to move in it. The moves are taken and scored in batches, starting with a single move and growing by LEAF_BATCH_GROWTH each time, so moves after a cutoff are neither generated nor scored. The game state has to be back at the position the moves are made from whenever the next move is taken.
+    """
+    moves = iter(moves)
+    batch_size = 1
+    while True:
+        batch = list(itertools.islice(moves, batch_size))
+        if not batch:
+            return
+        yield from zip(batch, score_boards(model, game_state, batch, evaluation_cache))
+        batch_size *= LEAF_BATCH_GROWTH
+
+
+def score_board(model, game_state: object, evaluation_cache=None) -> float:
+    """
+    Gives the current game state on the board a score. If the game state has an accumulator attached, the score is taken from it rather than from a forward pass of the model. Scores found in the evaluation cache given as an argument skip the model entirely.
     """
     turn_multiplier = 1 if game_state.turn is WHITE else -1
-    fen = forsyth_edwards_conversion(game_state)
-    binary = fen_to_binary_encoding(fen)
-    score = model(torch.from_numpy(binary))
-    score = score.item()
+    if evaluation_cache is not None:
+        score = evaluation_cache.get(game_state.zobrist_key)
+        if score is not None:
+            return turn_multiplier * score
+
+    if game_state.accumulator is not None:
+        score = game_state.accumulator.evaluate()
+    else:
+        binary = BOARD_ENCODER.encode([game_state.position.bitboards])
+        score = evaluate_binary(model, binary)[0]
 
+    if evaluation_cache is not None:
+        evaluation_cache.store(game_state.zobrist_key, score)
     return turn_multiplier * score
 
 
-def forsyth_edwards_conversion(game_state: object) -> str:
-    """
-    Converts the current game state to the Forsyth-Edwards Chess Notation.
-    https://en.wikipedia.org/wiki/Forsyth%E2%80%93Edwards_Notation
-    """
-    algebraic_notation_map = {
-        "w_pawn": "P",
-        "b_pawn": "p",
-        "w_rook": "R",
-        "b_rook": "r",
-        "w_knight": "N",
-        "b_knight": "n",
-        "w_bishop": "B",
-        "b_bishop": "b",
-        "w_queen": "Q",
-        "b_queen": "q",
-        "w_king": "K",
-        "b_king": "k",
-    }
-
-    fen = ""
-    for row in np.arange(GRID_DIMENSION):
-        blank_square_count = 0
-        for col in np.arange(GRID_DIMENSION):
-            piece = game_state.board[row][col]
-            if not piece:
-                blank_square_count += 1
-                if col == 7:
-                    fen += str(blank_square_count)
-
-            else:
-                if blank_square_count > 0:
-                    fen += str(blank_square_count)
-                    blank_square_count = 0
-                fen += algebraic_notation_map[piece.image_code]
-        if row < 7:
-            fen += "/"
-
-    # active color
-    if game_state.turn == WHITE:
-        fen += " w "
-    else:
-        fen += " b "
-
-    # castling availibility (castling is not implemented)
-    fen += "- "
-
-    # en passant target square (en passant is not implemented)
-    fen += "- "
-
-    # halfmove clock (does not need to be calculated since this function is only called by the AI)
-    fen += "0 "
-
-    # fullmove clock
-    fen += str(len(game_state.move_log) // 2)
-    return fen
-
-
-def fen_to_binary_encoding(fen: str) -> float:
-    """
-    Converts a string in Forsyth-Edwards Chess Notation into binary encoding (length of 768) which is readable by the deep learning model.
-    """
-    # get the bitboards for each team from the board
-    board = chess.Board(fen)
-    black_squares, white_squares = board.occupied_co
-
-    # Create the bitboards for each individual type of chess piece per team
-    b_pawn_bitboard = black_squares & board.pawns
-    b_knight_bitboard = black_squares & board.knights
-    b_bishop_bitboard = black_squares & board.bishops
-    b_rook_bitboard = black_squares & board.rooks
-    b_queen_bitboard = black_squares & board.queens
-    b_king_bitboard = black_squares & board.kings
-    w_pawn_bitboard = white_squares & board.pawns
-    w_knight_bitboard = white_squares & board.knights
-    w_bishop_bitboard = white_squares & board.bishops
-    w_rook_bitboard = white_squares & board.rooks
-    w_queen_bitboard = white_squares & board.queens
-    w_king_bitboard = white_squares & board.kings
-
-    # Combine the bitboards for each chess piece into a single array
-    bitboards = np.array(
-        [
-            b_pawn_bitboard,
-            b_knight_bitboard,
-            b_bishop_bitboard,
-            b_rook_bitboard,
-            b_queen_bitboard,
-            b_king_bitboard,
-            w_pawn_bitboard,
-            w_knight_bitboard,
-            w_bishop_bitboard,
-            w_rook_bitboard,
-            w_queen_bitboard,
-            w_king_bitboard,
-        ],
-        dtype=np.uint64,
-    )
+def score_boards(model, game_state: object, moves: list, evaluation_cache=None) -> list:
+    """
+    Gives the positions reached by each of the moves given as an argument a score, from the point of view of the player to move in them. Every position is encoded into one row of a single input, so the model only needs one forward pass to score all of them. With an accumulator attached, the moves are applied to a copy of its output instead. Positions found in the evaluation cache given as an argument are left out of the batch.
+    """
+    scores = [None] * len(moves)
+    keys = []
+    if evaluation_cache is not None:
+        keys = [game_state.zobrist_key_after_move(move) for move in moves]
+        scores = [evaluation_cache.get(key) for key in keys]
+    missing = [index for index, score in enumerate(scores) if score is None]
 
-    # add a new dimension to the bitboards array to make bitwise operations simpler for conversion into binary
-    bitboards = np.asarray(bitboards, dtype=np.uint64)[:, np.newaxis]
-    shift_amounts = GRID_DIMENSION * np.arange(
-        GRID_DIMENSION - 1, -1, -1, dtype=np.uint64
-    )
-    # shift the bits in the bitboards array by the shift amounts and convert to uint8 data type
-    binary = (bitboards >> shift_amounts).astype(np.uint8)
-    # converts the binary values to a 1D array of individual bits
-    binary = np.unpackbits(binary, bitorder="little")
-    # returns a float data type to be used by the deep learning model
-    return binary.astype(np.float32)
+    if missing:
+        if game_state.accumulator is not None:
+            missing_scores = game_state.accumulator.evaluate_moves(
+                [game_state.move_feature_changes(moves[index]) for index in missing]
+            )
+        else:
+            binary = BOARD_ENCODER.encode(
+                [game_state.bitboards_after_move(moves[index]) for index in missing]
+            )
+            missing_scores = evaluate_binary(model, binary)
+
+        for index, score in zip(missing, missing_scores):
+            scores[index] = score
+            if evaluation_cache is not None:
+                evaluation_cache.store(keys[index], score)
+
+    # the positions are scored for the opponent, who is the player to move once the moves have been made
+    turn_multiplier = -1 if game_state.turn is WHITE else 1
+    return [turn_multiplier * score for score in scores]
@@ -0,0 +1,144 @@
+"""
+Runs the evaluation model with NumPy alone, from its weights exported once from the torch checkpoint to a flat .npz
+file, so the AI can play without torch installed and without the seconds it takes to import. The model's input is 768
+bits of which a position sets at most 32, so rather than multiplying the whole input by the first layer's weights, the
+first layer's output is the sum of the weight rows of the bits that are set. The same weights also build the search's
+accumulator, which needs nothing from torch either.
+
+Usage, from the root of the repository:
+    python -m ai.numpy_model export
+    python -m ai.numpy_model verify 20
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from constants import *
+
+NUMPY_MODEL_PATH = "model/weights.npz"
+SPARSE_BATCH_LIMIT = 64  # largest batch summed bit by bit, larger batches are multiplied by the whole weight matrix
+
+
+class NumpyModel:
+    """
+    An evaluation model with two linear layers, such as the BoardEvaluationModel with a layer count of 2, evaluated
+    with NumPy. Calling it with the encoded positions returns a column of their scores, like the torch model does.
+    """
+
+    def __init__(
+        self,
+        hidden_weights: np.ndarray,
+        hidden_bias: np.ndarray,
+        output_weights: np.ndarray,
+        output_bias: float,
+    ) -> None:
+        self.hidden_weights = np.asarray(hidden_weights, dtype=np.float32)
+        self.hidden_bias = np.asarray(hidden_bias, dtype=np.float32)
+        self.output_weights = np.asarray(output_weights, dtype=np.float32).reshape(-1)
+        self.output_bias = float(output_bias)
+        # each row holds the weights of one input bit, so the bits of a position select whole contiguous rows
+        self.feature_weights = np.ascontiguousarray(self.hidden_weights.T)
+
+    @classmethod
+    def from_file(cls, path: str = NUMPY_MODEL_PATH) -> "NumpyModel":
+        """
+        Loads the weights exported to the .npz file at the given path, which are named as in the model's state dict.
+        """
+        with np.load(path) as state:
+            weights = [name for name in state.files if name.endswith(".weight")]
+            if len(weights) != 2:
+                raise ValueError(f"the NumPy model needs weights of 2 linear layers, not {len(weights)}")
+            hidden, output = (name[: -len(".weight")] for name in weights)
+            return cls(
+                state[f"{hidden}.weight"], state[f"{hidden}.bias"], state[f"{output}.weight"], state[f"{output}.bias"][0]
+            )
+
+    def __call__(self, binary: np.ndarray) -> np.ndarray:
+        """
+        Scores the positions encoded one per row of the binary input given as an argument.
+        """
+        if len(binary) > SPARSE_BATCH_LIMIT:
+            hidden = binary @ self.feature_weights
+        else:
+            hidden = np.empty((len(binary), len(self.hidden_bias)), dtype=np.float32)
+            for row, bits in enumerate(binary):
+                self.feature_weights[np.flatnonzero(bits)].sum(axis=0, out=hidden[row])
+        hidden += self.hidden_bias
+        np.maximum(hidden, 0, out=hidden)
+        return (hidden @ self.output_weights + self.output_bias).reshape(-1, 1)
+
+
+def export_model(checkpoint_path: str, path: str = NUMPY_MODEL_PATH) -> None:
+    """
+    Exports the weights of the torch checkpoint at the given path to a .npz file, keeping the names of its state dict.
+    Only the export needs torch.
+    """
+    import torch
+
+    state = torch.load(checkpoint_path)
+    np.savez(path, **{name: tensor.detach().cpu().numpy().astype(np.float32) for name, tensor in state.items()})
+
+
+def load_numpy_model(path: str = NUMPY_MODEL_PATH) -> NumpyModel:
+    """
+    Loads the NumPy model from the exported weights at the given path.
+    """
+    return NumpyModel.from_file(path)
+
+
+def load_evaluation_model(backend: str = MODEL_BACKEND) -> object:
+    """
+    Loads the model the AI evaluates positions with, which is the NumPy model unless a torch backend is given as an
+    argument. Torch is only imported for the torch backends.
+    """
+    if backend == "numpy":
+        return load_numpy_model()
+    from ai.model import load_model
+
+    return load_model(backend=backend)
+
+
+def verify_numpy_model(model: NumpyModel, position_count: int, seed: int) -> bool:
+    """
+    Scores the positions of random games, and the positions after each of their legal moves, with the NumPy model and
+    the torch model, and checks that the scores match. Returns false if any score differs by more than float rounding.
+    """
+    import torch
+
+    from ai.encoding import BoardEncoder
+    from ai.model import load_model, random_positions
+
+    torch_model = load_model()
+    positions, children = random_positions(position_count, seed)
+    encoder = BoardEncoder()
+    largest_error = 0.0
+    batches = [positions] + [bitboards for turn, bitboards in children]
+    for bitboards in batches:
+        binary = encoder.encode(bitboards)
+        with torch.no_grad():
+            expected = torch_model(torch.from_numpy(binary)).numpy()
+        largest_error = max(largest_error, float(np.abs(model(binary) - expected).max()))
+
+    print(f"{len(batches)} batches from {position_count} positions, largest difference {largest_error:.2e}")
+    return largest_error < 1e-4
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export of the model's weights for the NumPy model and its verification.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    export_parser = subparsers.add_parser("export", help="export the torch checkpoint's weights to a .npz file")
+    export_parser.add_argument("--checkpoint", default="model/chkpt.pt")
+    export_parser.add_argument("--path", default=NUMPY_MODEL_PATH)
+    verify_parser = subparsers.add_parser("verify", help="check the NumPy model's scores against the torch model")
+    verify_parser.add_argument("positions", type=int, help="amount of positions of random games to score")
+    verify_parser.add_argument("--path", default=NUMPY_MODEL_PATH)
+    verify_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_model(args.checkpoint, args.path)
+        print(f"exported {args.checkpoint} to {args.path}")
+    else:
+        sys.exit(0 if verify_numpy_model(load_numpy_model(args.path), args.positions, args.seed) else 1)
@@ -0,0 +1,241 @@
+"""
+Reads opening books in the Polyglot format, which most chess engines share. A book is a file of 16 byte entries sorted by
+the Polyglot hash of the position they belong to, each holding a move and a weight for how often it should be played.
+The file is memory-mapped and binary searched for the current position's hash, so only the few pages the search touches
+are ever read from disk.
+
+The Polyglot hash is a Zobrist hash with a fixed table of random numbers, kept in ai/polyglot_keys.py. Castling and en
+passant are not implemented, but book positions include them in their hash, so the castling rights are taken to be
+those the placement of the Kings and Rooks still allows and the en passant file is found from the last move.
+http://hgm.nubati.net/book_format.html
+
+Usage, from the root of the repository:
+    python -m ai.opening_book moves model/book.bin
+    python -m ai.opening_book verify 100
+"""
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import sys
+
+from constants import *
+from ai.polyglot_keys import POLYGLOT_RANDOM_ARRAY
+from engine.bitboard import PIECE_INDEX
+from engine.movement import (
+    CAPTURE_FLAG,
+    NULL_MOVE,
+    PROMOTION_TYPES,
+    encode_move,
+    move_end,
+    move_notation,
+    move_start,
+)
+
+OPENING_BOOK_PATH = "model/book.bin"
+BOOK_SELECTION = "weighted"  # "weighted" picks a book move at random by weight, "best" the move with the most weight
+
+ENTRY = struct.Struct(">QHHI")  # key, move, weight and learn value of a book entry, big endian
+
+# Polyglot numbers the squares from a1 rather than a8 and alternates black and white pieces of each type, while the
+# bitboards of each team follow the same order of types, so the key of a piece on a square is found by flipping the row
+POLYGLOT_PIECE_KEYS = [
+    [POLYGLOT_RANDOM_ARRAY[64 * (2 * (index % 6) + index // 6) + (square ^ 56)] for square in range(64)]
+    for index in range(12)
+]
+# the King's and Rook's starting squares of each castling right, in the order of their Polyglot keys
+POLYGLOT_CASTLING = [
+    (WHITE, 60, 63, POLYGLOT_RANDOM_ARRAY[768]),
+    (WHITE, 60, 56, POLYGLOT_RANDOM_ARRAY[769]),
+    (BLACK, 4, 7, POLYGLOT_RANDOM_ARRAY[770]),
+    (BLACK, 4, 0, POLYGLOT_RANDOM_ARRAY[771]),
+]
+POLYGLOT_EN_PASSANT_KEYS = POLYGLOT_RANDOM_ARRAY[772:780]
+POLYGLOT_WHITE_TO_MOVE_KEY = POLYGLOT_RANDOM_ARRAY[780]
+
+
+def polyglot_key(game_state: object) -> int:
+    """
+    Computes the Polyglot hash of the current position of the game state.
+    """
+    position = game_state.position
+    key = 0
+    for index, bitboard in enumerate(position.bitboards):
+        piece_keys = POLYGLOT_PIECE_KEYS[index]
+        while bitboard:
+            square = (bitboard & -bitboard).bit_length() - 1
+            key ^= piece_keys[square]
+            bitboard &= bitboard - 1
+
+    for team, king_square, rook_square, castling_key in POLYGLOT_CASTLING:
+        kings = position.bitboards[PIECE_INDEX[(team, KING)]]
+        rooks = position.bitboards[PIECE_INDEX[(team, ROOK)]]
+        if kings >> king_square & 1 and rooks >> rook_square & 1:
+            key ^= castling_key
+
+    # the en passant file only counts if a Pawn of the player to move stands next to the Pawn that moved two squares
+    if game_state.move_log and game_state.move_log[-1] != NULL_MOVE:
+        last_move = game_state.move_log[-1]
+        end = move_end(last_move)
+        pawn = position.piece_at(end)
+        if pawn.type == PAWN and abs(end - move_start(last_move)) == 16:
+            col = end & 7
+            neighbours = (1 << end - 1 if col > 0 else 0) | (1 << end + 1 if col < 7 else 0)
+            if neighbours & position.bitboards[PIECE_INDEX[(game_state.turn, PAWN)]]:
+                key ^= POLYGLOT_EN_PASSANT_KEYS[col]
+
+    if game_state.turn == WHITE:
+        key ^= POLYGLOT_WHITE_TO_MOVE_KEY
+    return key
+
+
+def polyglot_move(book_move: int) -> int:
+    """
+    Converts a move from its Polyglot encoding to a packed move without the capture flag.
+    """
+    end = (7 - (book_move >> 3 & 7)) << 3 | book_move & 7
+    start = (7 - (book_move >> 9 & 7)) << 3 | book_move >> 6 & 7
+    # Polyglot numbers the promotion pieces in the same order as packed moves
+    return encode_move(start, end, PROMOTION_TYPES[book_move >> 12 & 7])
+
+
+class OpeningBook:
+    """
+    A Polyglot opening book, memory-mapped from the file at the given path.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.file = open(path, "rb")
+        self.book = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.entry_count = len(self.book) // ENTRY.size
+
+    def entries(self, key: int) -> list:
+        """
+        Returns the move and weight of every entry of the position with the given Polyglot hash.
+        """
+        # binary search for the first entry with the key, the entries of a position are stored next to each other
+        low = 0
+        high = self.entry_count
+        while low < high:
+            middle = (low + high) // 2
+            if ENTRY.unpack_from(self.book, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+
+        entries = []
+        for index in range(low, self.entry_count):
+            entry_key, move, weight, learn = ENTRY.unpack_from(self.book, index * ENTRY.size)
+            if entry_key != key:
+                break
+            entries.append((move, weight))
+        return entries
+
+    def find_move(self, game_state: object, legal_moves: list, selection: str = BOOK_SELECTION) -> int:
+        """
+        Chooses a book move for the current position of the game state, either at random by weight or the move with the
+        most weight. Returns None if the position isn't in the book.
+        """
+        legal_move_map = {move & ~CAPTURE_FLAG: move for move in legal_moves}
+        moves = []
+        weights = []
+        for book_move, weight in self.entries(polyglot_key(game_state)):
+            # castling is written as the King capturing its own Rook, which is never legal here, so it's skipped
+            move = legal_move_map.get(polyglot_move(book_move))
+            if move is not None and weight > 0:
+                moves.append(move)
+                weights.append(weight)
+
+        if not moves:
+            return None
+        if selection == "best":
+            return moves[weights.index(max(weights))]
+        return random.choices(moves, weights)[0]
+
+    def close(self) -> None:
+        """
+        Unmaps the book and closes its file.
+        """
+        self.book.close()
+        self.file.close()
+
+
+def load_opening_book(path: str = OPENING_BOOK_PATH) -> OpeningBook:
+    """
+    Opens the opening book at the given path, or returns None if there is no book there.
+    """
+    if not os.path.isfile(path) or os.path.getsize(path) < ENTRY.size:
+        return None
+    return OpeningBook(path)
+
+
+def verify_polyglot_keys(game_count: int, seed: int) -> bool:
+    """
+    Plays random games and checks the Polyglot hash of every position reached against the chess package's. The chess
+    package's castling rights are replaced with the ones the pieces allow, since castling never happens here. Returns
+    false if any hash differs.
+    """
+    import chess
+    import chess.polyglot
+
+    from engine.random_games import random_games
+
+    positions = 0
+    mismatches = 0
+    for game_state, legal_moves in random_games(game_count, seed):
+        # the chess package's board follows the game one move at a time, which keeps the en passant square it needs
+        if not game_state.move_log:
+            board = chess.Board()
+        else:
+            board.push(chess.Move.from_uci(move_notation(game_state.move_log[-1])))
+        board.castling_rights = 0
+        for color, back_rank in ((chess.WHITE, chess.BB_RANK_1), (chess.BLACK, chess.BB_RANK_8)):
+            if board.king(color) == chess.msb(back_rank & chess.BB_FILE_E):
+                board.castling_rights |= board.pieces_mask(chess.ROOK, color) & chess.BB_CORNERS & back_rank
+        if polyglot_key(game_state) != chess.polyglot.zobrist_hash(board):
+            mismatches += 1
+            print(f"hash mismatch in {board.fen()}")
+        positions += 1
+
+    print(f"{positions} positions from {game_count} random games, {mismatches} hash mismatches")
+    return mismatches == 0
+
+
+def print_book_moves(book: OpeningBook, fen: str) -> None:
+    """
+    Prints the book moves of the position with the given FEN and their weights.
+    """
+    from engine.game_state import GameState
+
+    game_state = GameState(fen)
+    legal_move_map = {move & ~CAPTURE_FLAG: move for move in game_state.get_legal_moves()}
+    entries = book.entries(polyglot_key(game_state))
+    total_weight = sum(weight for move, weight in entries) or 1
+    for book_move, weight in sorted(entries, key=lambda entry: entry[1], reverse=True):
+        move = polyglot_move(book_move)
+        note = "" if move in legal_move_map else " (not playable)"
+        print(f"{move_notation(move)} {weight} ({100 * weight / total_weight:.1f}%){note}")
+    print(f"{len(entries)} book moves out of {book.entry_count} entries")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Polyglot opening book lookup and hash verification.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    moves_parser = subparsers.add_parser("moves", help="list the book moves of a position")
+    moves_parser.add_argument("book", nargs="?", default=OPENING_BOOK_PATH)
+    moves_parser.add_argument("--fen", help="position to look up, defaults to the start position")
+    verify_parser = subparsers.add_parser("verify", help="check the Polyglot hashes against the chess package")
+    verify_parser.add_argument("games", type=int, help="amount of random games to play")
+    verify_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "moves":
+        book = load_opening_book(args.book)
+        if book is None:
+            sys.exit(f"no opening book at {args.book}")
+        print_book_moves(book, args.fen)
+        book.close()
+    else:
+        sys.exit(0 if verify_polyglot_keys(args.games, args.seed) else 1)
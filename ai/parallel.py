@@ -0,0 +1,206 @@
+"""
+Splits the root moves of a search between a pool of worker processes, which search their share of the moves at the same
+time on separate cores. Every worker has its own game state, built from the position's FEN, and its own copy of the
+model, transposition table and evaluation cache, so nothing is shared between them while they search. The best move is
+taken from the deepest depth every worker completed.
+
+Usage, from the root of the repository:
+    python -m ai.parallel 4 --workers 1 2 4
+"""
+
+import argparse
+import logging
+import math
+import multiprocessing
+import time
+
+import numpy as np
+
+from constants import *
+from ai.encoding import forsyth_edwards_conversion
+from ai.negamax import (
+    BITBASES,
+    MAX_DEPTH,
+    OPENING_BOOK,
+    SEARCH_NODE_LIMIT,
+    SEARCH_TIME_LIMIT,
+    USE_ACCUMULATOR,
+    SearchContext,
+    is_mate_score,
+    iterative_deepening,
+)
+from engine.game_state import GameState
+from engine.movement import move_notation
+
+logger = logging.getLogger(__name__)
+
+# the model and tables of a worker process, created once when the worker starts and reused by all it's searches
+_worker = {}
+
+
+def _start_worker(backend: str, transposition_table_size_mb: float) -> None:
+    """
+    Loads the model and creates the tables of a newly started worker process.
+    """
+    from ai.evaluation_cache import EvaluationCache
+    from ai.numpy_model import load_evaluation_model
+    from ai.transposition import TranspositionTable
+
+    if backend != "numpy":
+        import torch
+
+        # every worker searches on its own core, more threads per worker would compete for the same cores
+        torch.set_num_threads(1)
+    _worker["model"] = load_evaluation_model(backend)
+    _worker["transposition_table"] = TranspositionTable(transposition_table_size_mb)
+    _worker["evaluation_cache"] = EvaluationCache(EVALUATION_CACHE_SIZE)
+
+
+def _search_root_moves(task: tuple) -> tuple:
+    """
+    Searches a share of the root moves of the position with the given FEN in a worker process, returning the score and
+    best move of every completed depth and the amount of nodes searched.
+    """
+    fen, root_moves, time_limit, node_limit, max_depth = task
+    game_state = GameState(fen)
+    transposition_table = _worker["transposition_table"]
+    transposition_table.new_search()
+    # the worker's share of the root moves says nothing about the others, so the root isn't stored in its table
+    search = SearchContext(
+        transposition_table,
+        time_limit,
+        node_limit,
+        evaluation_cache=_worker["evaluation_cache"],
+        bitbases=BITBASES,
+        store_root=False,
+    )
+    iterations = iterative_deepening(
+        _worker["model"], game_state, list(root_moves), search, max_depth, USE_ACCUMULATOR
+    )
+    return iterations, search.nodes
+
+
+class ParallelSearch:
+    """
+    A pool of worker processes which search the root moves of a position between them. The pool is started once and
+    kept for every search, since starting a process and loading the model into it takes far longer than a search.
+    """
+
+    def __init__(
+        self,
+        worker_count: int = SEARCH_WORKERS,
+        backend: str = MODEL_BACKEND,
+        transposition_table_size_mb: float = TRANSPOSITION_TABLE_SIZE_MB,
+        opening_book=OPENING_BOOK,
+    ) -> None:
+        self.worker_count = worker_count
+        self.opening_book = opening_book
+        # the memory budget of the transposition table is split between the workers
+        self.pool = multiprocessing.Pool(
+            worker_count,
+            initializer=_start_worker,
+            initargs=(backend, transposition_table_size_mb / worker_count),
+        )
+
+    def find_best_move(
+        self,
+        game_state: object,
+        legal_moves: list,
+        time_limit: float = SEARCH_TIME_LIMIT,
+        node_limit: int = SEARCH_NODE_LIMIT,
+        max_depth: int = MAX_DEPTH,
+    ) -> int:
+        """
+        Calculates the best move the AI could make in the next turn, with every worker searching an equal share of the
+        legal moves. The time limit applies to every worker at once, while the node limit is split between them. Positions
+        found in the opening book are answered with a book move without starting the workers.
+        """
+        # shuffle the move list to randomize which move the AI will make in the case there are multiple moves with the same score
+        np.random.shuffle(legal_moves)
+        if len(legal_moves) <= 1:
+            return legal_moves[0] if legal_moves else None
+
+        if self.opening_book is not None:
+            move = self.opening_book.find_move(game_state, legal_moves)
+            if move is not None:
+                logger.info("book move %s", move_notation(move))
+                return move
+
+        fen = forsyth_edwards_conversion(game_state)
+        # the moves are dealt out in turn so every worker gets a similar mix of moves
+        shares = [legal_moves[worker :: self.worker_count] for worker in range(self.worker_count)]
+        shares = [share for share in shares if share]
+        worker_node_limit = None if node_limit is None else node_limit // len(shares)
+        tasks = [(fen, share, time_limit, worker_node_limit, max_depth) for share in shares]
+
+        start_time = time.perf_counter()
+        results = self.pool.map(_search_root_moves, tasks, chunksize=1)
+        depth, score, move = best_common_iteration([iterations for iterations, nodes in results])
+        logger.info(
+            "%d workers, depth %d, score %.3f, %d nodes in %.2fs, best move %s",
+            len(shares),
+            depth,
+            score,
+            sum(nodes for iterations, nodes in results),
+            time.perf_counter() - start_time,
+            move_notation(move),
+        )
+        return move
+
+    def close(self) -> None:
+        """
+        Stops the worker processes.
+        """
+        self.pool.terminate()
+        self.pool.join()
+
+
+def best_common_iteration(worker_iterations: list) -> tuple:
+    """
+    Picks the best move from the iterations completed by every worker. Scores are only comparable between moves searched
+    to the same depth, so the deepest depth every worker completed is used. A worker which stopped early because it
+    found a forced checkmate keeps that score at every deeper depth.
+    """
+    unfinished_depths = [
+        len(iterations) for iterations in worker_iterations if not is_mate_score(iterations[-1][0])
+    ]
+    depth = min(unfinished_depths) if unfinished_depths else max(map(len, worker_iterations))
+
+    best_score = -math.inf
+    best_move = worker_iterations[0][min(depth, len(worker_iterations[0])) - 1][1]
+    for iterations in worker_iterations:
+        score, move = iterations[min(depth, len(iterations)) - 1]
+        if score > best_score:
+            best_score = score
+            best_move = move
+    return depth, best_score, best_move
+
+
+def time_to_depth(fens: list, depth: int, worker_counts: list) -> None:
+    """
+    Measures how long searching every position given as an argument to a fixed depth takes with each amount of workers.
+    """
+    for worker_count in worker_counts:
+        search = ParallelSearch(worker_count)
+        # the first search waits for the workers to start, so it isn't timed
+        search.find_best_move(GameState(), GameState().get_legal_moves(), max_depth=1)
+
+        start_time = time.perf_counter()
+        for fen in fens:
+            game_state = GameState(fen)
+            search.find_best_move(game_state, game_state.get_legal_moves(), time_limit=math.inf, max_depth=depth)
+        elapsed = time.perf_counter() - start_time
+        search.close()
+        print(f"{worker_count} workers: depth {depth} in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time to depth of the parallel search with different amounts of workers.")
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, multiprocessing.cpu_count()])
+    parser.add_argument("--fen", help="position to search, defaults to the whole benchmark set")
+    args = parser.parse_args()
+
+    from ai.benchmark import BENCHMARK_POSITIONS
+
+    time_to_depth([args.fen] if args.fen else BENCHMARK_POSITIONS, args.depth, args.workers)
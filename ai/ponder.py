@@ -0,0 +1,194 @@
+"""
+While the human thinks about their move the AI would otherwise sit idle. Pondering uses that time to search the
+positions the human's possible replies lead to in a background process, starting with the reply the AI's own search
+expects and continuing with the others until the human moves. Once they do, the move found for their reply is played
+straight away, and if the reply was being searched at that moment its search simply carries on until its time is up.
+
+The pondering process searches with its own copy of the transposition table, which is lost with the process. Along with
+the move, it sends back the entries of the line of play it expects after the human's reply, which are stored in the
+AI's own table. The next turn's pondering then starts with the reply the AI expects from the human.
+"""
+
+import logging
+from multiprocessing import Event, Process, Queue, Value
+
+from constants import *
+from ai.encoding import forsyth_edwards_conversion
+from ai.negamax import (
+    BITBASES,
+    MAX_DEPTH,
+    SEARCH_NODE_LIMIT,
+    SEARCH_TIME_LIMIT,
+    TRANSPOSITION_TABLE,
+    EVALUATION_CACHE,
+    OPENING_BOOK,
+    USE_ACCUMULATOR,
+    SearchContext,
+    SearchInterrupted,
+    find_best_move,
+    iterative_deepening,
+    principal_variation,
+)
+from engine.game_state import GameState
+from engine.movement import move_notation
+
+NO_REPLY = -1  # Shared with the pondering process until the human has moved
+
+logger = logging.getLogger(__name__)
+
+
+class PonderSearchContext(SearchContext):
+    """
+    The search context of a reply being pondered, which is abandoned as soon as the human plays a different move.
+    """
+
+    def __init__(self, reply: int, human_reply, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.reply = reply
+        self.human_reply = human_reply
+
+    def count_node(self) -> None:
+        if self.human_reply.value not in (NO_REPLY, self.reply):
+            raise SearchInterrupted
+        super().count_node()
+
+
+def principal_variation_entries(game_state: object, transposition_table) -> list:
+    """
+    Returns the depth, score, bound and best move stored in the transposition table for every position along the
+    principal variation from the current position, with checkmate scores counting from the current position.
+    """
+    entries = []
+    for ply, move in enumerate(principal_variation(game_state, transposition_table, MAX_DEPTH)):
+        depth, score, bound, _ = transposition_table.probe(game_state.zobrist_key, ply)
+        entries.append((depth, score, bound, move))
+        game_state.execute_move(move)
+    for _ in entries:
+        game_state.undo_move()
+    return entries
+
+
+def seed_principal_variation(game_state: object, transposition_table, entries: list) -> None:
+    """
+    Stores the entries of a principal variation from the current position, as returned by principal_variation_entries,
+    in the transposition table.
+    """
+    for ply, (depth, score, bound, move) in enumerate(entries):
+        transposition_table.store(game_state.zobrist_key, depth, score, bound, move, ply)
+        game_state.execute_move(move)
+    for _ in entries:
+        game_state.undo_move()
+
+
+def _ponder(model, fen: str, human_reply, replied, best_moves) -> None:
+    """
+    Searches the AI's best move after every reply of the human in the position with the given FEN, until the human
+    moves. Runs in the pondering process, which puts the AI's move for the human's actual reply on the queue, with the
+    transposition table's entries along the principal variation after that reply.
+    """
+    game_state = GameState(fen)
+    # the transposition table is copied from the AI's last search, which already expects one of the replies
+    expected_replies = principal_variation(game_state, TRANSPOSITION_TABLE, 1)
+    replies = expected_replies + [move for move in game_state.get_legal_moves() if move not in expected_replies]
+
+    pondered_moves = {}
+    for reply in replies:
+        if human_reply.value not in (NO_REPLY, reply):
+            break
+        game_state.execute_move(reply)
+        legal_moves = game_state.get_legal_moves()
+        book_move = OPENING_BOOK.find_move(game_state, legal_moves) if OPENING_BOOK and legal_moves else None
+        if book_move is not None:
+            pondered_moves[reply] = book_move
+        elif legal_moves:
+            TRANSPOSITION_TABLE.new_search()
+            search = PonderSearchContext(
+                reply,
+                human_reply,
+                TRANSPOSITION_TABLE,
+                SEARCH_TIME_LIMIT,
+                SEARCH_NODE_LIMIT,
+                evaluation_cache=EVALUATION_CACHE,
+                bitbases=BITBASES,
+            )
+            iterations = iterative_deepening(model, game_state, legal_moves, search, MAX_DEPTH, USE_ACCUMULATOR)
+            if iterations:
+                pondered_moves[reply] = iterations[-1][1]
+                logger.info(
+                    "pondered %s: depth %d, best reply %s",
+                    move_notation(reply),
+                    len(iterations),
+                    move_notation(iterations[-1][1]),
+                )
+        game_state.undo_move()
+
+    replied.wait()
+    reply = human_reply.value
+    game_state.execute_move(reply)
+    if reply not in pondered_moves:
+        # the reply wasn't reached before the human played it, so it is searched the same way as without pondering
+        pondered_moves[reply] = find_best_move(model, game_state, game_state.get_legal_moves())
+    best_moves.put((pondered_moves[reply], principal_variation_entries(game_state, TRANSPOSITION_TABLE)))
+
+
+class Ponderer:
+    """
+    Ponders during the human's turn in a background process, which is started anew for every turn so it begins with a
+    copy of the AI's latest transposition table and evaluation cache.
+    """
+
+    def __init__(self, model) -> None:
+        self.model = model
+        self.process = None
+        self.move_log = None
+
+    def ponder(self, game_state: object) -> None:
+        """
+        Starts pondering the human's replies in the position of the game state, unless that position is already being
+        pondered. Pondering any earlier position is stopped.
+        """
+        if self.process is not None and self.move_log == game_state.move_log:
+            return
+        self.stop()
+        if game_state.checkmate or game_state.stalemate:
+            return
+
+        self.move_log = list(game_state.move_log)
+        self.human_reply = Value("q", NO_REPLY, lock=False)
+        self.replied = Event()
+        self.best_moves = Queue()
+        self.process = Process(
+            target=_ponder,
+            args=(self.model, forsyth_edwards_conversion(game_state), self.human_reply, self.replied, self.best_moves),
+            daemon=True,
+        )
+        self.process.start()
+
+    def find_best_move(self, game_state: object) -> int:
+        """
+        Returns the AI's move after the human's reply which was pondered, waiting for its search to finish if the reply
+        was being searched when the human played it. The line of play the search expects is stored in the AI's
+        transposition table. Returns None if the position before the human's move wasn't pondered, in which case the
+        move has to be searched for as usual.
+        """
+        if self.process is None or game_state.move_log[:-1] != self.move_log:
+            self.stop()
+            return None
+
+        self.human_reply.value = game_state.move_log[-1]
+        self.replied.set()
+        move, entries = self.best_moves.get()
+        self.stop()
+        seed_principal_variation(game_state, TRANSPOSITION_TABLE, entries)
+        return move
+
+    def stop(self) -> None:
+        """
+        Stops the pondering process, discarding anything it found.
+        """
+        if self.process is not None:
+            # the process inherits the GUI's handler for the terminate signal, so it is killed instead
+            self.process.kill()
+            self.process.join()
+        self.process = None
+        self.move_log = None
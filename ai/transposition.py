@@ -0,0 +1,134 @@
+"""
+The transposition table remembers the result of searching a position, keyed by its Zobrist key, so the same position
+reached through a different move order, or again in a later search, doesn't need to be searched from scratch. The table
+has a fixed amount of slots set by a memory budget, and each key maps to a single slot.
+
+Checkmate scores count the moves from the root of the search until the checkmate, but a position may be reached at a
+different distance from the root than where it was stored. They are stored counting from the position itself instead,
+and converted back by the distance from the root the position is probed at.
+"""
+
+from array import array
+
+from constants import MATE_THRESHOLD
+
+EXACT = 0  # the score is the exact value of the position
+LOWER_BOUND = 1  # the search failed high, the position is worth at least the score
+UPPER_BOUND = 2  # the search failed low, the position is worth at most the score
+
+# key, score, depth, bound, generation and move, see the arrays created below
+ENTRY_SIZE = 8 + 8 + 1 + 1 + 1 + 2
+
+# packed moves never start and end on the same square, so zero can mark an entry without a best move
+NO_MOVE = 0
+
+
+class TranspositionTable:
+    """
+    A fixed size table of search results. Each entry holds the depth a position was searched to, the score found, whether
+    that score is exact or a bound, and the best move. When two positions compete for the same slot, the one searched
+    deeper is kept, unless it was stored during an earlier search.
+    """
+
+    def __init__(self, size_mb: float) -> None:
+        self.size = max(1, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+        # every field is kept in its own compact array rather than as a list of tuples, which would use several times
+        # the memory budget
+        self.keys = array("Q", bytes(8 * self.size))
+        self.scores = array("d", bytes(8 * self.size))
+        self.depths = array("b", bytes(self.size))
+        self.bounds = array("B", bytes(self.size))
+        self.generations = array("B", bytes(self.size))
+        self.moves = array("H", bytes(2 * self.size))
+        self.generation = 0
+        self.used = 0
+        self.probes = 0
+        self.hits = 0
+
+    def new_search(self) -> None:
+        """
+        Starts a new search, which resets the hit rate and lets the entries of earlier searches be replaced first.
+        """
+        # the generation is stored in a byte, entries 256 searches old look current again but are still valid results
+        self.generation = (self.generation + 1) % 256
+        self.probes = 0
+        self.hits = 0
+
+    def probe(self, key: int, ply: int = 0) -> tuple:
+        """
+        Returns the depth, score, bound and best move stored for the given key, or None if there is no entry. A
+        checkmate score is converted to count from the root, which is the given amount of moves away.
+        """
+        self.probes += 1
+        index = key % self.size
+        if self.keys[index] != key or not self.depths[index]:
+            return None
+
+        self.hits += 1
+        move = self.moves[index]
+        score = self.scores[index]
+        if score >= MATE_THRESHOLD:
+            score -= ply
+        elif score <= -MATE_THRESHOLD:
+            score += ply
+        return self.depths[index] - 1, score, self.bounds[index], move if move != NO_MOVE else None
+
+    def best_move(self, key: int) -> int:
+        """
+        Returns the best move stored for the given key, or None if there is none, without counting towards the hit rate.
+        """
+        index = key % self.size
+        if self.keys[index] != key or not self.depths[index] or self.moves[index] == NO_MOVE:
+            return None
+        return self.moves[index]
+
+    def store(self, key: int, depth: int, score: float, bound: int, move: int = None, ply: int = 0) -> None:
+        """
+        Stores the result of searching the position with the given key to the given depth, the given amount of moves
+        from the root. An entry of another position in the same slot is only replaced if it was searched less deeply or
+        during an earlier search.
+        """
+        index = key % self.size
+        stored_depth = self.depths[index] - 1
+        if stored_depth < 0:
+            self.used += 1
+        elif self.keys[index] != key and self.generations[index] == self.generation and stored_depth > depth:
+            return
+
+        if move is None:
+            # keep the best move of an earlier search of the same position rather than forgetting it
+            move = self.moves[index] if self.keys[index] == key else NO_MOVE
+        # a checkmate is stored as the amount of moves from this position rather than from the root
+        if score >= MATE_THRESHOLD:
+            score += ply
+        elif score <= -MATE_THRESHOLD:
+            score -= ply
+        self.keys[index] = key
+        self.scores[index] = score
+        # depths are stored one higher so an empty slot, which is all zeroes, can be told apart from a depth 0 entry
+        self.depths[index] = depth + 1
+        self.bounds[index] = bound
+        self.generations[index] = self.generation
+        self.moves[index] = move
+
+    def clear(self) -> None:
+        """
+        Removes every entry and resets the hit rate.
+        """
+        self.depths = array("b", bytes(self.size))
+        self.moves = array("H", bytes(2 * self.size))
+        self.used = 0
+        self.probes = 0
+        self.hits = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the probe and hit counts and hit rate of the current search, and how many slots of the table are used.
+        """
+        return {
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "used": self.used,
+            "size": self.size,
+        }
@@ -14,3 +14,12 @@ BOARD_SIZE = 512  # Size of board in pixels
 GRID_DIMENSION = 8  # Amount of squares in each row and column
 SQUARE_SIZE = BOARD_SIZE // GRID_DIMENSION  # Size of each square in pixels
 FPS = 15
+
+LEGAL_MOVE_CACHE_SIZE = 50000  # Maximum amount of positions whose legal moves are cached
+TRANSPOSITION_TABLE_SIZE_MB = 64  # Memory budget of the search's transposition table in megabytes
+EVALUATION_CACHE_SIZE = 200000  # Maximum amount of positions whose evaluation is cached
+SEARCH_WORKERS = 1  # Amount of processes searching the AI's moves in parallel, 1 searches in the main process
+PONDER = True  # Whether the AI searches its replies to the human's moves while the human is thinking
+MATE_SCORE = 10000.0  # Score of checkmating, less the amount of moves until the checkmate, above any other score
+MATE_THRESHOLD = MATE_SCORE - 1000  # Scores at least this far from zero are checkmates
+MODEL_BACKEND = "numpy"  # "numpy" evaluates positions without torch, "float" and "int8" with the torch model in ai/model.py
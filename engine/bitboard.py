@@ -0,0 +1,72 @@
+"""
+A bitboard is a 64-bit integer where each bit represents one square of the board. Squares are numbered row by row,
+so square 0 is the top left corner (row 0, col 0) and square 63 the bottom right corner (row 7, col 7). This is the
+same order the deep learning model reads its input in.
+"""
+
+from constants import *
+
+EMPTY = 0
+FULL = (1 << 64) - 1
+
+# index of each team and piece type's bitboard, ordered the same way as the deep learning model's input
+PIECE_INDEX = {
+    (BLACK, PAWN): 0,
+    (BLACK, KNIGHT): 1,
+    (BLACK, BISHOP): 2,
+    (BLACK, ROOK): 3,
+    (BLACK, QUEEN): 4,
+    (BLACK, KING): 5,
+    (WHITE, PAWN): 6,
+    (WHITE, KNIGHT): 7,
+    (WHITE, BISHOP): 8,
+    (WHITE, ROOK): 9,
+    (WHITE, QUEEN): 10,
+    (WHITE, KING): 11,
+}
+
+
+def square_index(row: int, col: int) -> int:
+    """
+    Converts a (row, col) location into it's square index.
+    """
+    return row * GRID_DIMENSION + col
+
+
+def square_location(square: int) -> tuple:
+    """
+    Converts a square index into it's (row, col) location.
+    """
+    return divmod(square, GRID_DIMENSION)
+
+
+def square_name(square: int) -> str:
+    """
+    Converts a square index into it's algebraic name, such as e4.
+    """
+    row, col = square_location(square)
+    return f"{'abcdefgh'[col]}{GRID_DIMENSION - row}"
+
+
+def square_bit(row: int, col: int) -> int:
+    """
+    Returns a bitboard with only the given square set.
+    """
+    return 1 << (row * GRID_DIMENSION + col)
+
+
+def iterate_squares(bitboard: int):
+    """
+    Yields the index of every set square in the bitboard, lowest first.
+    """
+    while bitboard:
+        lowest_bit = bitboard & -bitboard
+        yield lowest_bit.bit_length() - 1
+        bitboard ^= lowest_bit
+
+
+def count_squares(bitboard: int) -> int:
+    """
+    Returns the amount of set squares in the bitboard.
+    """
+    return bin(bitboard).count("1")
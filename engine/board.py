@@ -1,6 +1,6 @@
 import numpy as np
 
-from constants import WHITE, BLACK
+from constants import WHITE, BLACK, GRID_DIMENSION
 from enums import *
 from pieces.pawn import Pawn
 from pieces.rook import Rook
@@ -9,6 +9,16 @@ from pieces.bishop import Bishop
 from pieces.queen import Queen
 from pieces.king import King
 
+# maps each piece letter of Forsyth-Edwards Notation to it's piece class, upper case letters are white pieces
+FEN_PIECES = {
+    "p": Pawn,
+    "r": Rook,
+    "n": Knight,
+    "b": Bishop,
+    "q": Queen,
+    "k": King,
+}
+
 
 def game_board() -> np.array:
     """
@@ -98,3 +108,25 @@ def game_board() -> np.array:
             ],
         ]
     )
+
+
+def fen_board(fen: str) -> tuple:
+    """
+    Returns a 2d array representing the individual pieces as objects, and the team to move, from a string in
+    Forsyth-Edwards Notation. The castling and en passant fields are ignored since neither rule is implemented.
+    """
+    fields = fen.split()
+    board = np.empty((GRID_DIMENSION, GRID_DIMENSION), dtype=object)
+    for row, rank in enumerate(fields[0].split("/")):
+        col = 0
+        for letter in rank:
+            if letter.isdigit():
+                col += int(letter)
+                continue
+
+            team = WHITE if letter.isupper() else BLACK
+            board[row][col] = FEN_PIECES[letter.lower()](team, (row, col))
+            col += 1
+
+    turn = BLACK if len(fields) > 1 and fields[1] == "b" else WHITE
+    return board, turn
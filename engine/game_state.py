@@ -1,8 +1,11 @@
-import numpy as np
-
 from constants import *
+from engine.bitboard import *
 from engine.player import Player
-from engine.board import game_board
+from engine.board import game_board, fen_board
+from engine.position import Position
+from engine.move_cache import LegalMoveCache
+from engine.movement import *
+from engine.zobrist import *
 
 # piece classes are imported for handling pawn promotion
 from pieces.rook import Rook
@@ -16,29 +19,76 @@ class GameState:
     Represents the game engine and the current state of the game.
     """
 
-    def __init__(self) -> None:
-        self.board = game_board()
+    def __init__(
+        self,
+        fen: str = None,
+        verify_zobrist_key: bool = False,
+        legal_move_cache_size: int = LEGAL_MOVE_CACHE_SIZE,
+    ) -> None:
+        board, turn = fen_board(fen) if fen else (game_board(), WHITE)
+        self.position = Position(board)
         self.players = {
             WHITE: Player(WHITE, True),
             BLACK: Player(BLACK, True),
         }
+        for player in self.players.values():
+            player.update_king_square(self.board)
         self.move_log = []
-        self.turn = WHITE
+        # the moved and captured piece of every move in the move log, needed to undo them
+        self.undo_log = []
+        self.turn = turn
         self.checkmate = False
         self.stalemate = False
+        self.zobrist_key = compute_zobrist_key(self.position, self.turn)
+        # debug mode which checks the incrementally updated key against a recomputation after every change
+        self.verify_zobrist_key = verify_zobrist_key
+        self.legal_move_cache = LegalMoveCache(legal_move_cache_size)
+        # an optional accumulator of the evaluation model's first layer, kept up to date with every move
+        self.accumulator = None
 
-    def execute_move(self, move: object) -> None:
+    @property
+    def board(self) -> list:
+        """
+        The 2d array view of the board, kept in sync with the bitboards of the current position.
         """
-        Executes the move given as an argument.
+        return self.position.board
+
+    def execute_move(self, move: int) -> None:
         """
-        move.moved_piece.location = move.end_square
-        self.board[move.start_square[0]][move.start_square[1]] = None
-        self.board[move.end_square[0]][move.end_square[1]] = move.moved_piece
+        Executes the packed move given as an argument.
+        """
+        if self.accumulator is not None:
+            self.accumulator.push(*self.move_feature_changes(move))
+        start = move_start(move)
+        end = move_end(move)
+        moved_piece = self.position.remove_piece(start)
+        captured_piece = self.position.remove_piece(end)
+        if captured_piece:
+            self.zobrist_key ^= PIECE_KEYS[captured_piece.bitboard_index][end]
+        if moved_piece.type == KING:
+            self.players[self.turn].king_square = end
+        self.position.place_piece(moved_piece, end)
+        piece_keys = PIECE_KEYS[moved_piece.bitboard_index]
+        self.zobrist_key ^= piece_keys[start] ^ piece_keys[end]
         self.move_log.append(move)
-        self.players[self.turn].update_piece_list(self.board)
-        if move.is_pawn_promotion and move.promotion_choice:
-            self._handle_promotion(move)
+        self.undo_log.append((moved_piece, captured_piece))
+        promotion = move_promotion(move)
+        if promotion:
+            self._handle_promotion(moved_piece, promotion, end)
+
+        self._swap_player_turn()
+        if self.verify_zobrist_key:
+            self._verify_zobrist_key()
 
+    def execute_null_move(self) -> None:
+        """
+        Passes the turn to the other player without moving a piece, which is never legal but lets the search test how
+        strong a position is by giving the opponent a free move. Undone by undo_move like any other move.
+        """
+        if self.accumulator is not None:
+            self.accumulator.push([], [])
+        self.move_log.append(NULL_MOVE)
+        self.undo_log.append((None, None))
         self._swap_player_turn()
 
     def undo_move(self) -> None:
@@ -49,101 +99,269 @@ class GameState:
             return
 
         move = self.move_log.pop()
-        move.moved_piece.location = move.start_square
-        self.board[move.end_square[0]][move.end_square[1]] = move.captured_piece
-        self.board[move.start_square[0]][move.start_square[1]] = move.moved_piece
-        self.players[self.turn].update_piece_list(self.board)
+        moved_piece, captured_piece = self.undo_log.pop()
+        if move == NULL_MOVE:
+            self._swap_player_turn()
+            self.checkmate = False
+            self.stalemate = False
+            if self.accumulator is not None:
+                self.accumulator.pop(self.position.bitboards)
+            return
+
+        start = move_start(move)
+        end = move_end(move)
         self._swap_player_turn()
+        # the piece on the end square is removed rather than the moved piece itself, in case it was promoted
+        end_piece = self.position.remove_piece(end)
+        if moved_piece.type == KING:
+            self.players[self.turn].king_square = start
+        self.position.place_piece(moved_piece, start)
+        self.zobrist_key ^= PIECE_KEYS[end_piece.bitboard_index][end]
+        self.zobrist_key ^= PIECE_KEYS[moved_piece.bitboard_index][start]
+        if captured_piece:
+            self.position.place_piece(captured_piece, end)
+            self.zobrist_key ^= PIECE_KEYS[captured_piece.bitboard_index][end]
         self.checkmate = False
         self.stalemate = False
+        if self.accumulator is not None:
+            self.accumulator.pop(self.position.bitboards)
+        if self.verify_zobrist_key:
+            self._verify_zobrist_key()
+
+    def set_accumulator(self, accumulator: object) -> None:
+        """
+        Attaches an accumulator, which is refreshed from the current position and then updated by every move made or
+        undone. Giving None detaches it again.
+        """
+        self.accumulator = accumulator
+        if accumulator is not None:
+            accumulator.refresh(self.position.bitboards)
 
     def get_legal_moves(self) -> list:
         """
-        Calculates all legal moves, accounting for checks and checkmate.
+        Calculates all legal moves as packed integers, accounting for checks and checkmate. The pieces giving check and
+        the pieces pinned to the king are found once for the whole position, so only legal moves are ever generated.
+        Positions seen recently are served from the legal move cache instead.
         """
-        moves = self._get_possible_moves()
+        cached = self.legal_move_cache.get(self.zobrist_key)
+        if cached is not None:
+            moves, self.checkmate, self.stalemate = cached
+            return moves
 
-        # loops through list of moves backwards to prevent bugs from occuring when deleting invalid moves
-        for move in moves[::-1]:
-            # execute_move() automatically swaps player's turns, we need to reswap turns again otherwise our
-            # helper methods will calculate for the wrong player
-            self.execute_move(move)
-            self._swap_player_turn()
-            move_would_put_king_in_check = self._king_in_check()
-            if move_would_put_king_in_check:
-                moves.remove(move)
-            self._swap_player_turn()
-            self.undo_move()
+        enemy_occupancy = self.position.occupancy[BLACK if self.turn == WHITE else WHITE]
+        piece_targets, checkers = self._get_piece_targets()
+        moves = []
+        for square, piece, targets in piece_targets:
+            if piece.type == KING:
+                targets = self._safe_king_targets(targets)
+            moves += encode_moves(square, targets, enemy_occupancy, piece.can_promote(square))
 
         if len(moves) == 0:
-            self._check_gameover_conditions()
+            self._check_gameover_conditions(bool(checkers))
+        self.legal_move_cache.store(self.zobrist_key, moves, self.checkmate, self.stalemate)
         return moves
 
-    def _swap_player_turn(self) -> None:
+    def generate_staged_moves(self, hash_move: int = None):
         """
-        Swaps the current player in the game between white or black.
+        Lazily yields the legal moves as packed integers in stages: the hash move given as an argument (if it is legal),
+        then captures and promotions, then quiet moves. Each stage is only generated once the previous one has been
+        used up, so a search which stops early after a beta cutoff never pays for generating the quiet moves.
         """
-        self.turn = BLACK if self.turn == WHITE else WHITE
+        cached = self.legal_move_cache.get(self.zobrist_key)
+        if cached is not None:
+            moves, self.checkmate, self.stalemate = cached
+            yield from self._stage_cached_moves(moves, hash_move)
+            return
+
+        enemy_occupancy = self.position.occupancy[BLACK if self.turn == WHITE else WHITE]
+        piece_targets, checkers = self._get_piece_targets()
+        moves = []
+
+        if hash_move is not None:
+            # the hash move may come from a different position with the same key, so it is checked against the moves
+            # the piece on it's start square could make to it's end square
+            hash_start = move_start(hash_move)
+            hash_end = 1 << move_end(hash_move)
+            for square, piece, targets in piece_targets:
+                if square == hash_start:
+                    targets &= hash_end
+                    if piece.type == KING:
+                        targets = self._safe_king_targets(targets)
+                    if hash_move in encode_moves(square, targets, enemy_occupancy, piece.can_promote(square)):
+                        moves.append(hash_move)
+                        yield hash_move
+                    break
+
+        for is_capture_stage in (True, False):
+            for square, piece, targets in piece_targets:
+                is_promotion = piece.can_promote(square)
+                # every promotion is generated with the captures, since they change the material balance as much
+                if not is_promotion:
+                    if is_capture_stage:
+                        targets &= enemy_occupancy
+                    else:
+                        targets &= ~enemy_occupancy
+                elif not is_capture_stage:
+                    continue
+
+                if piece.type == KING:
+                    targets = self._safe_king_targets(targets)
+                for move in encode_moves(square, targets, enemy_occupancy, is_promotion):
+                    if move != hash_move:
+                        moves.append(move)
+                        yield move
+
+        if len(moves) == 0:
+            self._check_gameover_conditions(bool(checkers))
+        self.legal_move_cache.store(self.zobrist_key, moves, self.checkmate, self.stalemate)
 
-    def _check_gameover_conditions(self) -> None:
+    def bitboards_after_move(self, move: int) -> list:
         """
-        Checks if the game is in either a checkmate or stalemate situation.
+        Returns the piece bitboards of the position a packed move leads to, without making the move. Cheaper than
+        making and undoing the move when only the resulting piece placement is needed, such as for scoring it.
         """
-        king_is_in_check = self._king_in_check()
-        if king_is_in_check:
-            self.checkmate = True
-        else:
-            self.stalemate = True
+        bitboards = list(self.position.bitboards)
+        removed, added = self.move_feature_changes(move)
+        for feature in removed + added:
+            bitboards[feature >> 6] ^= 1 << (feature & 63)
+        return bitboards
 
-    def _king_in_check(self) -> bool:
+    def zobrist_key_after_move(self, move: int) -> int:
         """
-        Calculates if the current player's king is in a check situation.
+        Returns the Zobrist key of the position a packed move leads to, without making the move.
         """
-        if self.turn == WHITE:
-            for piece in self.players[WHITE].piece_list:
-                if piece.type == KING:
-                    return self._piece_under_attack(piece)
+        key = self.zobrist_key ^ BLACK_TO_MOVE_KEY
+        removed, added = self.move_feature_changes(move)
+        for feature in removed + added:
+            key ^= PIECE_KEYS[feature >> 6][feature & 63]
+        return key
+
+    def move_feature_changes(self, move: int) -> tuple:
+        """
+        Returns the pieces a packed move takes off squares and puts on squares, without making the move. Each piece on a
+        square is given as it's bitboard index times 64 plus the square index, which is it's index in the evaluation
+        model's input.
+        """
+        start = move_start(move)
+        end = move_end(move)
+        moved_piece = self.position.piece_at(start)
+        removed = [moved_piece.bitboard_index << 6 | start]
+        promotion = move_promotion(move)
+        if promotion:
+            added = [PIECE_INDEX[(moved_piece.team, promotion)] << 6 | end]
         else:
-            for piece in self.players[BLACK].piece_list:
-                if piece.type == KING:
-                    return self._piece_under_attack(piece)
+            added = [moved_piece.bitboard_index << 6 | end]
+        if move & CAPTURE_FLAG:
+            removed.append(self.position.piece_at(end).bitboard_index << 6 | end)
+        return removed, added
 
-    def _piece_under_attack(self, piece: object) -> bool:
+    def is_square_attacked(self, square: int, by_team: str) -> bool:
         """
-        Calculates if the piece given as an argument could come under attack by the opponent.
+        Returns true or false if the given square index is attacked by any of the given team's pieces.
         """
-        self._swap_player_turn()
-        opponents_possible_moves = self._get_possible_moves()
+        return self.position.is_square_attacked(square, by_team)
 
-        for move in opponents_possible_moves:
-            piece_is_under_attack = piece.location == move.end_square
-            if piece_is_under_attack:
-                self._swap_player_turn()
-                return True
-        self._swap_player_turn()
-        return False
+    def king_in_check(self) -> bool:
+        """
+        Returns true or false if the current player's king is in check.
+        """
+        return self._king_in_check()
 
-    def _get_possible_moves(self) -> list:
+    def get_logged_movement(self, index: int = -1) -> Movement:
         """
-        Calculates all potential moves, regardless of checks and checkmate.
+        Expands a packed move from the move log into a movement object for the GUI.
         """
-        moves = []
-        for row in np.arange(len(self.board)):
-            for col in np.arange(len(self.board[row])):
-                square_is_empty = self.board[row][col] == None
-                if square_is_empty:
-                    continue
+        moved_piece, captured_piece = self.undo_log[index]
+        return Movement.from_pieces(self.move_log[index], moved_piece, captured_piece)
+
+    def _get_piece_targets(self) -> tuple:
+        """
+        Finds the squares each of the current player's pieces can legally move to. The pieces giving check and the
+        pieces pinned to the king are found once for the whole position, and used to restrict every other piece's
+        targets. The king's targets still need checking with _safe_king_targets, which is left to the caller since it
+        is the most expensive part. Returns a list of (square, piece, targets) tuples and the bitboard of checking pieces.
+        """
+        king_square = self.players[self.turn].king_square
+        checkers, check_mask = self.position.checks(king_square, self.turn)
+        pins = self.position.pins(king_square, self.turn)
+        is_double_check = count_squares(checkers) > 1
 
-                piece = self.board[row][col]
-                piece_is_opponents = piece.team != self.turn
-                if piece_is_opponents:
+        piece_targets = []
+        for square in iterate_squares(self.position.occupancy[self.turn]):
+            piece = self.position.piece_at(square)
+            targets = piece.get_targets(square, self.position)
+            if piece.type != KING:
+                if is_double_check:
                     continue
+                targets &= check_mask & pins.get(square, FULL)
+            piece_targets.append((square, piece, targets))
+        return piece_targets, checkers
 
-                moves += piece.get_moves(row, col, self.board)
-        return moves
+    def _safe_king_targets(self, targets: int) -> int:
+        """
+        Removes the squares attacked by the opponent from the current player's king targets.
+        """
+        enemy_team = BLACK if self.turn == WHITE else WHITE
+        # the king is removed from the board so it can't hide behind itself when stepping away from a slider
+        occupied = self.position.occupied ^ (1 << self.players[self.turn].king_square)
+        for target in iterate_squares(targets):
+            if self.position.is_square_attacked(target, enemy_team, occupied):
+                targets ^= 1 << target
+        return targets
+
+    def _stage_cached_moves(self, moves: list, hash_move: int):
+        """
+        Yields cached legal moves in the same stages as generate_staged_moves.
+        """
+        if hash_move in moves:
+            yield hash_move
+        quiet_moves = []
+        for move in moves:
+            if move == hash_move:
+                continue
+            if move_is_capture(move) or move_promotion(move):
+                yield move
+            else:
+                quiet_moves.append(move)
+        yield from quiet_moves
+
+    def _swap_player_turn(self) -> None:
+        """
+        Swaps the current player in the game between white or black.
+        """
+        self.turn = BLACK if self.turn == WHITE else WHITE
+        self.zobrist_key ^= BLACK_TO_MOVE_KEY
+
+    def _verify_zobrist_key(self) -> None:
+        """
+        Checks the incrementally updated Zobrist key against one computed from scratch.
+        """
+        expected_key = compute_zobrist_key(self.position, self.turn)
+        if self.zobrist_key != expected_key:
+            raise RuntimeError(
+                f"Zobrist key {self.zobrist_key:016x} does not match recomputed key {expected_key:016x}"
+            )
+
+    def _check_gameover_conditions(self, king_is_in_check: bool) -> None:
+        """
+        Checks if the game is in either a checkmate or stalemate situation.
+        """
+        if king_is_in_check:
+            self.checkmate = True
+        else:
+            self.stalemate = True
+
+    def _king_in_check(self) -> bool:
+        """
+        Calculates if the current player's king is in a check situation.
+        """
+        enemy_team = BLACK if self.turn == WHITE else WHITE
+        return self.is_square_attacked(self.players[self.turn].king_square, enemy_team)
 
-    def _handle_promotion(self, move: object) -> None:
-        team = move.moved_piece.team
-        type = move.promotion_choice.capitalize()
-        promoted_piece = eval(type)(team, move.end_square)
-        self.board[move.end_square[0]][move.end_square[1]] = promoted_piece
+    def _handle_promotion(self, pawn: object, promotion: str, square: int) -> None:
+        type = promotion.capitalize()
+        promoted_piece = eval(type)(pawn.team, square_location(square))
+        self.position.remove_piece(square)
+        self.position.place_piece(promoted_piece, square)
+        self.zobrist_key ^= PIECE_KEYS[pawn.bitboard_index][square]
+        self.zobrist_key ^= PIECE_KEYS[promoted_piece.bitboard_index][square]
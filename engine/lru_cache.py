@@ -0,0 +1,63 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Remembers values of recently seen positions, keyed by their Zobrist key. Once the cache holds its maximum amount of
+    entries the least recently used entry is evicted. A maximum of 0 or less turns the cache off.
+    """
+
+    def __init__(self, max_entries: int) -> None:
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: int) -> object:
+        """
+        Returns the value stored for the given key, or None if there is none.
+        """
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return value
+
+    def store(self, key: int, value: object) -> None:
+        """
+        Stores the value of the position with the given key.
+        """
+        if self.max_entries <= 0:
+            return
+
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """
+        Removes every entry and resets the hit and miss counters.
+        """
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Returns the hit and miss counts, hit rate and size of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.entries),
+            "max_entries": self.max_entries,
+        }
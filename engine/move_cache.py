@@ -0,0 +1,33 @@
+from array import array
+
+from engine.lru_cache import LRUCache
+
+
+class LegalMoveCache(LRUCache):
+    """
+    Remembers the legal moves of recently seen positions, keyed by their Zobrist key, so positions reached again after
+    an undo or through a different move order don't need their moves generated again. Once the cache holds its maximum
+    amount of entries the least recently used entry is evicted.
+    """
+
+    def get(self, key: int) -> tuple:
+        """
+        Returns the legal moves, checkmate and stalemate flags stored for the given key, or None if there are none.
+        """
+        entry = super().get(key)
+        if entry is None:
+            return None
+
+        moves, checkmate, stalemate = entry
+        # a new list is returned every time since callers are free to shuffle or modify it
+        return list(moves), checkmate, stalemate
+
+    def store(self, key: int, moves: list, checkmate: bool, stalemate: bool) -> None:
+        """
+        Stores the legal moves, checkmate and stalemate flags of the position with the given key.
+        """
+        if self.max_entries <= 0:
+            return
+
+        # packed moves fit in 16 bits, so they are stored in a compact array rather than a list of integer objects
+        super().store(key, (array("H", moves), checkmate, stalemate))
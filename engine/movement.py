@@ -1,4 +1,89 @@
+"""
+Moves are generated and searched as packed integers rather than movement objects. Bits 0-5 hold the start square index,
+bits 6-11 the end square index, bits 12-14 the piece a Pawn promotes to and bit 15 whether the move is a capture.
+"""
+
 from constants import *
+from engine.bitboard import square_index, square_location, square_name, iterate_squares
+
+START_MASK = 0x3F
+END_SHIFT = 6
+PROMOTION_SHIFT = 12
+CAPTURE_FLAG = 1 << 15
+# a move never starts and ends on the same square, so 0 is free to stand for passing the turn
+NULL_MOVE = 0
+
+# index 0 means the move is not a promotion
+PROMOTION_TYPES = [None, KNIGHT, BISHOP, ROOK, QUEEN]
+PROMOTION_INDEX = {type: index for index, type in enumerate(PROMOTION_TYPES)}
+
+
+def encode_move(start: int, end: int, promotion: str = None, is_capture: bool = False) -> int:
+    """
+    Packs a move from the start square index to the end square index into a single integer.
+    """
+    move = start | end << END_SHIFT | PROMOTION_INDEX[promotion] << PROMOTION_SHIFT
+    if is_capture:
+        move |= CAPTURE_FLAG
+    return move
+
+
+def encode_moves(start: int, targets: int, captures: int, is_promotion: bool = False) -> list:
+    """
+    Packs a move from the start square index to every square set in the targets bitboard. Squares also set in the
+    captures bitboard are flagged as captures, and Pawn moves onto the last row generate one move per promotion choice.
+    """
+    moves = []
+    for end in iterate_squares(targets):
+        move = start | end << END_SHIFT
+        if captures >> end & 1:
+            move |= CAPTURE_FLAG
+        if is_promotion:
+            for promotion in range(1, len(PROMOTION_TYPES)):
+                moves.append(move | promotion << PROMOTION_SHIFT)
+        else:
+            moves.append(move)
+    return moves
+
+
+def move_start(move: int) -> int:
+    """
+    Returns the start square index of a packed move.
+    """
+    return move & START_MASK
+
+
+def move_end(move: int) -> int:
+    """
+    Returns the end square index of a packed move.
+    """
+    return move >> END_SHIFT & START_MASK
+
+
+def move_promotion(move: int) -> str:
+    """
+    Returns the piece type a packed move promotes to, or None if it isn't a promotion.
+    """
+    return PROMOTION_TYPES[move >> PROMOTION_SHIFT & 7]
+
+
+def move_is_capture(move: int) -> bool:
+    """
+    Returns true or false if a packed move captures a piece.
+    """
+    return bool(move & CAPTURE_FLAG)
+
+
+def move_notation(move: int) -> str:
+    """
+    Returns the long algebraic notation of a packed move, such as e2e4 or a7a8q.
+    """
+    notation = square_name(move_start(move)) + square_name(move_end(move))
+    promotion = move_promotion(move)
+    if promotion:
+        notation += "n" if promotion == KNIGHT else promotion[0]
+    return notation
+
 
 class Movement:
     """
@@ -13,6 +98,41 @@ class Movement:
         self.is_pawn_promotion = self._pawn_promotion()
         self.promotion_choice = None
 
+    @classmethod
+    def from_packed(cls, move: int, board: list) -> "Movement":
+        """
+        Expands a packed move into a movement object, using the board as it was before the move was made.
+        """
+        movement = cls(square_location(move_start(move)), square_location(move_end(move)), board)
+        movement.promotion_choice = move_promotion(move)
+        return movement
+
+    @classmethod
+    def from_pieces(cls, move: int, moved_piece: object, captured_piece: object) -> "Movement":
+        """
+        Expands a packed move into a movement object from the pieces it moved and captured, for moves that have
+        already been made.
+        """
+        start_square = square_location(move_start(move))
+        end_square = square_location(move_end(move))
+        # an excerpt of the board as it was before the move, holding only the two squares involved
+        board = {start_square[0]: {}, end_square[0]: {}}
+        board[start_square[0]][start_square[1]] = moved_piece
+        board[end_square[0]][end_square[1]] = captured_piece
+        return cls.from_packed(move, board)
+
+    @property
+    def packed(self) -> int:
+        """
+        The packed integer form of the move, as generated by the game state.
+        """
+        return encode_move(
+            square_index(*self.start_square),
+            square_index(*self.end_square),
+            self.promotion_choice,
+            self.captured_piece is not None,
+        )
+
     def __eq__(self, other):
         if not isinstance(other, Movement):
             return False
@@ -0,0 +1,150 @@
+"""
+Perft walks the tree of legal moves to a fixed depth and counts the leaf nodes, which both measures the speed of move
+generation and verifies it against known counts. The counts are cross-checked against the chess package, which serves
+as an offline oracle.
+
+Usage, from the root of the repository:
+    python -m engine.perft perft 3
+    python -m engine.perft divide 2 --fen "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+"""
+
+import argparse
+import sys
+import time
+
+from engine.game_state import GameState
+from engine.movement import move_notation
+
+# castling and en passant are not implemented, so every position has neither right available
+PERFT_POSITIONS = [
+    "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1",
+    "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w - - 0 1",
+    "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+    "r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b - - 0 1",
+    "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w - - 1 8",
+    "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1",
+]
+
+
+def perft(game_state: object, depth: int) -> int:
+    """
+    Counts the leaf nodes of the tree of legal moves to the given depth.
+    """
+    if depth == 0:
+        return 1
+
+    moves = game_state.get_legal_moves()
+    # the leaves don't need to be visited, counting the moves that lead to them is enough
+    if depth == 1:
+        return len(moves)
+
+    nodes = 0
+    for move in moves:
+        game_state.execute_move(move)
+        nodes += perft(game_state, depth - 1)
+        game_state.undo_move()
+    return nodes
+
+
+def divide(game_state: object, depth: int) -> dict:
+    """
+    Counts the leaf nodes of the tree of legal moves to the given depth separately for each move from the root.
+    """
+    counts = {}
+    for move in game_state.get_legal_moves():
+        game_state.execute_move(move)
+        counts[move_notation(move)] = perft(game_state, depth - 1)
+        game_state.undo_move()
+    return counts
+
+
+def oracle_divide(fen: str, depth: int) -> dict:
+    """
+    Counts the leaf nodes for each move from the root using the chess package. Castling and en passant moves are left
+    out, matching the rules implemented by the engine.
+    """
+    import chess
+
+    board = chess.Board(fen)
+
+    def oracle_perft(depth: int) -> int:
+        if depth == 0:
+            return 1
+        nodes = 0
+        for move in board.legal_moves:
+            if board.is_castling(move) or board.is_en_passant(move):
+                continue
+            board.push(move)
+            nodes += oracle_perft(depth - 1)
+            board.pop()
+        return nodes
+
+    counts = {}
+    for move in board.legal_moves:
+        if board.is_castling(move) or board.is_en_passant(move):
+            continue
+        board.push(move)
+        counts[move.uci()] = oracle_perft(depth - 1)
+        board.pop()
+    return counts
+
+
+def run_perft(fens: list, depth: int, check: bool) -> bool:
+    """
+    Runs perft on every position given as an argument and reports the node counts and speed. Returns false if any count
+    disagrees with the oracle.
+    """
+    all_match = True
+    total_nodes = 0
+    total_time = 0
+    for fen in fens:
+        # the legal move cache is disabled so move generation itself is measured
+        game_state = GameState(fen, legal_move_cache_size=0)
+        start_time = time.perf_counter()
+        nodes = perft(game_state, depth)
+        elapsed = time.perf_counter() - start_time
+        total_nodes += nodes
+        total_time += elapsed
+
+        report = f"{fen}\n    depth {depth}: {nodes} nodes in {elapsed:.2f}s ({nodes / elapsed:,.0f} nodes/s)"
+        if check:
+            expected = sum(oracle_divide(fen, depth).values())
+            matches = nodes == expected
+            all_match = all_match and matches
+            report += " ok" if matches else f" MISMATCH, expected {expected}"
+        print(report)
+
+    print(f"total: {total_nodes} nodes in {total_time:.2f}s ({total_nodes / total_time:,.0f} nodes/s)")
+    return all_match
+
+
+def run_divide(fen: str, depth: int, check: bool) -> bool:
+    """
+    Runs divide on the position given as an argument and reports the node count of each root move. Returns false if
+    any count disagrees with the oracle.
+    """
+    counts = divide(GameState(fen, legal_move_cache_size=0), depth)
+    expected = oracle_divide(fen, depth) if check else counts
+    for notation in sorted(set(counts) | set(expected)):
+        line = f"{notation}: {counts.get(notation, 0)}"
+        if counts.get(notation) != expected.get(notation):
+            line += f" MISMATCH, expected {expected.get(notation, 0)}"
+        print(line)
+    print(f"total: {sum(counts.values())}")
+    return counts == expected
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Perft move generation benchmark and correctness suite.")
+    parser.add_argument("command", choices=["perft", "divide"])
+    parser.add_argument("depth", type=int)
+    parser.add_argument("--fen", help="position to run on, defaults to the whole suite (or the start position for divide)")
+    parser.add_argument("--no-check", action="store_true", help="skip cross-checking the counts against the chess package")
+    args = parser.parse_args()
+
+    if args.command == "perft":
+        fens = [args.fen] if args.fen else PERFT_POSITIONS
+        passed = run_perft(fens, args.depth, not args.no_check)
+    else:
+        passed = run_divide(args.fen or PERFT_POSITIONS[0], args.depth, not args.no_check)
+    sys.exit(0 if passed else 1)
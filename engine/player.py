@@ -1,31 +1,24 @@
-import numpy as np
-
 from constants import *
+from engine.bitboard import square_index
 
 
 class Player:
     def __init__(self, team: str, is_human: bool) -> None:
         self.team = team
         self.is_human = is_human
-        self.piece_list = []
-
-    def update_piece_list(self, board: list) -> None:
-        """
-        Update's the player's piece list based on the board given as an argument.
-        """
-        self.piece_list = self._traverse_board(board)
+        self.king_square = None
 
-    def _traverse_board(self, board: list) -> list:
+    def update_king_square(self, board: list) -> None:
         """
-        Create's a new piece list based on the board given as an argument.
+        Finds the player's king square on the board given as an argument. Only needed when setting up a new board, since
+        every move of the king afterwards updates it directly.
         """
-        piece_list = []
-        for row in np.arange(len(board)):
-            for col in np.arange(len(board[row])):
+        self.king_square = None
+        for row in range(len(board)):
+            for col in range(len(board[row])):
                 piece = board[row][col]
-                if self._piece_is_owned_by_player(piece):
-                    piece_list.append(board[row][col])
-        return piece_list
+                if self._piece_is_owned_by_player(piece) and piece.type == KING:
+                    self.king_square = square_index(row, col)
 
     def _piece_is_owned_by_player(self, piece: object) -> bool:
         """
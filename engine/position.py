@@ -0,0 +1,152 @@
+from constants import *
+from engine.bitboard import *
+from pieces.main import ORTHOGONAL_OFFSETS, DIAGONAL_OFFSETS, RAYS, sliding_movement
+from pieces.pawn import PAWN_ATTACKS
+from pieces.knight import KNIGHT_ATTACKS
+from pieces.king import KING_ATTACKS
+
+
+class Position:
+    """
+    Represents the placement of every piece on the board. The twelve piece bitboards (one per team and piece type) and
+    the occupancy of each team are the canonical state, while the 2d array of piece objects is kept in sync as a view
+    of the board for the GUI and movement objects. A flat list of the pieces on each square index is kept alongside
+    for looking up which piece sits on a square found through the bitboards.
+    """
+
+    def __init__(self, board: list) -> None:
+        self.board = board
+        self.squares = [None] * (GRID_DIMENSION * GRID_DIMENSION)
+        self.bitboards = [EMPTY] * len(PIECE_INDEX)
+        self.occupancy = {WHITE: EMPTY, BLACK: EMPTY}
+        for row in range(GRID_DIMENSION):
+            for col in range(GRID_DIMENSION):
+                piece = self.board[row][col]
+                if piece:
+                    self.squares[square_index(row, col)] = piece
+                    self._toggle_bits(piece, square_bit(row, col))
+
+    @property
+    def occupied(self) -> int:
+        """
+        Returns a bitboard of every occupied square on the board.
+        """
+        return self.occupancy[WHITE] | self.occupancy[BLACK]
+
+    def pieces(self, team: str, type: str) -> int:
+        """
+        Returns the bitboard of the given team's pieces of the given type.
+        """
+        return self.bitboards[PIECE_INDEX[(team, type)]]
+
+    def piece_at(self, square: int) -> object:
+        """
+        Returns the piece on the given square index, or None if the square is empty.
+        """
+        return self.squares[square]
+
+    def place_piece(self, piece: object, square: int) -> None:
+        """
+        Places the piece given as an argument on an empty square.
+        """
+        row, col = square_location(square)
+        self.board[row][col] = piece
+        self.squares[square] = piece
+        self._toggle_bits(piece, 1 << square)
+
+    def remove_piece(self, square: int) -> object:
+        """
+        Removes and returns the piece on the given square, or None if the square is empty.
+        """
+        piece = self.squares[square]
+        if piece:
+            row, col = square_location(square)
+            self.board[row][col] = None
+            self.squares[square] = None
+            self._toggle_bits(piece, 1 << square)
+        return piece
+
+    def is_square_attacked(self, square: int, by_team: str, occupied: int = None) -> bool:
+        """
+        Returns true or false if any of the given team's pieces attack the given square. Rather than generating the
+        team's moves, it looks outward from the square along knight, king, pawn and sliding piece lines and stops at the
+        first attacker found. Sliding pieces are blocked by the occupied squares given as an argument, which defaults to
+        the current occupancy of the board.
+        """
+        defending_team = BLACK if by_team == WHITE else WHITE
+        # a piece attacks the square if the same kind of piece placed on the square would attack it back
+        if KNIGHT_ATTACKS[square] & self.pieces(by_team, KNIGHT):
+            return True
+        if PAWN_ATTACKS[defending_team][square] & self.pieces(by_team, PAWN):
+            return True
+        if KING_ATTACKS[square] & self.pieces(by_team, KING):
+            return True
+
+        if occupied is None:
+            occupied = self.occupied
+        queens = self.pieces(by_team, QUEEN)
+        for offsets, type in ((ORTHOGONAL_OFFSETS, ROOK), (DIAGONAL_OFFSETS, BISHOP)):
+            sliders = self.pieces(by_team, type) | queens
+            for offset in offsets:
+                # the blockers along the ray only need finding if there is a slider somewhere on it
+                if RAYS[offset][square] & sliders and sliding_movement(square, offset, occupied) & sliders:
+                    return True
+        return False
+
+    def checks(self, square: int, team: str) -> tuple:
+        """
+        Finds the enemy pieces giving check to the given team's king on the given square. Returns a bitboard of the
+        checking pieces and a bitboard of the squares a move must land on to resolve a single check, which covers every
+        square when the king is not in check.
+        """
+        enemy_team = BLACK if team == WHITE else WHITE
+        occupied = self.occupied
+        checkers = KNIGHT_ATTACKS[square] & self.pieces(enemy_team, KNIGHT)
+        checkers |= PAWN_ATTACKS[team][square] & self.pieces(enemy_team, PAWN)
+        # blocking a sliding piece's check is also allowed, so every square of the ray towards it is included
+        check_mask = checkers
+        for offsets, type in ((ORTHOGONAL_OFFSETS, ROOK), (DIAGONAL_OFFSETS, BISHOP)):
+            sliders = self.pieces(enemy_team, type) | self.pieces(enemy_team, QUEEN)
+            for offset in offsets:
+                ray = sliding_movement(square, offset, occupied)
+                if ray & sliders:
+                    checkers |= ray & sliders
+                    check_mask |= ray
+
+        if not checkers:
+            return checkers, FULL
+        return checkers, check_mask
+
+    def pins(self, square: int, team: str) -> dict:
+        """
+        Finds the given team's pieces pinned to their king on the given square. Returns a dictionary mapping each pinned
+        piece's square index to a bitboard of the squares it can still move to, which is the line between the king and
+        the pinning piece.
+        """
+        enemy_team = BLACK if team == WHITE else WHITE
+        occupied = self.occupied
+        pins = {}
+        for offsets, type in ((ORTHOGONAL_OFFSETS, ROOK), (DIAGONAL_OFFSETS, BISHOP)):
+            sliders = self.pieces(enemy_team, type) | self.pieces(enemy_team, QUEEN)
+            if not sliders:
+                continue
+
+            for offset in offsets:
+                ray = sliding_movement(square, offset, occupied)
+                blocker = ray & self.occupancy[team]
+                if not blocker:
+                    continue
+
+                # the ray continues past the blocking piece up to the next occupied square
+                blocker_square = blocker.bit_length() - 1
+                pin_ray = sliding_movement(blocker_square, offset, occupied)
+                if pin_ray & sliders:
+                    pins[blocker_square] = ray | pin_ray
+        return pins
+
+    def _toggle_bits(self, piece: object, bit: int) -> None:
+        """
+        Toggles the given square in the bitboards of the piece given as an argument.
+        """
+        self.bitboards[piece.bitboard_index] ^= bit
+        self.occupancy[piece.team] ^= bit
@@ -0,0 +1,30 @@
+"""
+Plays random games for the tools that check the engine and the AI against another implementation, such as the encoding
+through FEN, the torch model or the chess package, in every position the games reach.
+"""
+
+import random
+
+from engine.game_state import GameState
+
+RANDOM_GAME_LENGTH = 200  # moves after which a random game is cut short, since random games rarely end by themselves
+
+
+def random_games(game_count: int, seed: int, undo_rate: float = 0.0):
+    """
+    Plays the given amount of random games, or plays them endlessly if the amount is None, yielding the game state and
+    its legal moves in every position reached before a random move is played. After each move, the move is undone
+    again at the given rate, so positions are also reached by undoing moves.
+    """
+    generator = random.Random(seed)
+    game = 0
+    while game_count is None or game < game_count:
+        game_state = GameState()
+        legal_moves = game_state.get_legal_moves()
+        while legal_moves and len(game_state.move_log) < RANDOM_GAME_LENGTH:
+            yield game_state, legal_moves
+            game_state.execute_move(generator.choice(legal_moves))
+            if undo_rate and generator.random() < undo_rate:
+                game_state.undo_move()
+            legal_moves = game_state.get_legal_moves()
+        game += 1
@@ -0,0 +1,36 @@
+"""
+Zobrist hashing gives every position a 64-bit key by XORing together a random number for each piece on each square,
+plus one for the side to move. Making or undoing a move only changes a few of those numbers, so the key can be updated
+by XORing them in and out instead of being recomputed.
+"""
+
+import random
+
+from constants import *
+from engine.bitboard import PIECE_INDEX, iterate_squares
+
+# the generator is seeded so keys stay the same between runs
+_generator = random.Random(20230301)
+
+PIECE_KEYS = [
+    [_generator.getrandbits(64) for square in range(GRID_DIMENSION * GRID_DIMENSION)]
+    for index in range(len(PIECE_INDEX))
+]
+BLACK_TO_MOVE_KEY = _generator.getrandbits(64)
+
+# castling and en passant are not implemented yet, their keys are reserved so adding them won't change existing keys
+CASTLING_KEYS = [_generator.getrandbits(64) for rights in range(16)]
+EN_PASSANT_KEYS = [_generator.getrandbits(64) for col in range(GRID_DIMENSION)]
+
+
+def compute_zobrist_key(position: object, turn: str) -> int:
+    """
+    Computes the Zobrist key of the position from scratch.
+    """
+    key = 0
+    for index, bitboard in enumerate(position.bitboards):
+        for square in iterate_squares(bitboard):
+            key ^= PIECE_KEYS[index][square]
+    if turn == BLACK:
+        key ^= BLACK_TO_MOVE_KEY
+    return key
@@ -2,6 +2,8 @@ import numpy as np
 import pygame as pg
 
 from constants import *
+from engine.bitboard import square_index, square_location
+from engine.movement import move_start, move_end, move_is_capture
 
 
 def load_images() -> list:
@@ -48,6 +50,7 @@ def draw_game_state(
     draw_pieces(screen, game_state)
     highlight_squares(screen, game_state, legal_moves, selected_square)
     highlight_previous_move(screen, game_state)
+    highlight_check(screen, game_state)
 
 
 def draw_board(screen: object):
@@ -110,12 +113,13 @@ def highlight_movement_options(
     """
     Highlights all valid movements that a piece may make.
     """
+    selected_square_index = square_index(*selected_square)
     for move in legal_moves:
         color = "blue"
-        if move.start_square == selected_square:
-            if move.captured_piece:
+        if move_start(move) == selected_square_index:
+            if move_is_capture(move):
                 color = "red"
-            highlight_individual_square(screen, color, move.end_square)
+            highlight_individual_square(screen, color, square_location(move_end(move)))
 
 
 def highlight_individual_square(
@@ -139,12 +143,18 @@ def highlight_previous_move(screen: object, game_state: object):
     Highlights the previous move made by the last player.
     """
     if len(game_state.move_log) >= 1:
-        highlight_individual_square(
-            screen, "yellow", game_state.move_log[-1].start_square
-        )
-        highlight_individual_square(
-            screen, "yellow", game_state.move_log[-1].end_square
-        )
+        previous_move = game_state.get_logged_movement()
+        highlight_individual_square(screen, "yellow", previous_move.start_square)
+        highlight_individual_square(screen, "yellow", previous_move.end_square)
+
+
+def highlight_check(screen: object, game_state: object):
+    """
+    Highlights the current player's king when it is in check.
+    """
+    if game_state.king_in_check():
+        king_square = game_state.players[game_state.turn].king_square
+        highlight_individual_square(screen, "red", square_location(king_square))
 
 
 def animate_move(move, game_state, screen, clock):
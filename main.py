@@ -1,43 +1,23 @@
+import logging
 import pygame as pg
-from multiprocessing import Process, Queue
 from constants import *
 from engine.game_state import GameState
 from gui import draw_game_state, draw_text, animate_move
 from engine.movement import Movement
 from ai.negamax import find_random_move, find_best_move
-import torch
-from torch import nn
-import pytorch_lightning as pl
-from collections import OrderedDict
+from ai.parallel import ParallelSearch
+from ai.ponder import Ponderer
+from ai.numpy_model import load_evaluation_model
 
 pg.init()
 
 
-class BoardEvaluationModel(pl.LightningModule):
-    def __init__(
-        self, learning_rate=1e-3, batch_size=1024, layer_count=10, binary_input_size=768
-    ):
-        super().__init__()
-        self.batch_size = batch_size
-        self.learning_rate = learning_rate
-        layers = []
-        for i in range(layer_count - 1):
-            layers.append(
-                (f"linear-{i}", nn.Linear(binary_input_size, binary_input_size))
-            )
-            layers.append((f"relu-{i}", nn.ReLU()))
-        layers.append((f"linear-{layer_count - 1}", nn.Linear(binary_input_size, 1)))
-        self.seq = nn.Sequential(OrderedDict(layers))
-
-    def forward(self, input_board_state):
-        return self.seq(input_board_state)
-
-
 def main(model) -> None:
     screen = pg.display.set_mode((BOARD_SIZE, BOARD_SIZE))
     clock = pg.time.Clock()
     game_state = GameState()
     legal_moves = game_state.get_legal_moves()
+    legal_move_set = set(legal_moves)  # used for checking if the user's move is legal
     selected_square = ()  # tuple to represent (row, col) of last selected square
     select_log = []
     is_running = True
@@ -49,12 +29,19 @@ def main(model) -> None:
     black_is_player = False
     ai_is_thinking = False
     move_finder_process = None
+    # searching with more than one worker process spreads the AI's search over several cores
+    parallel_search = ParallelSearch(SEARCH_WORKERS) if SEARCH_WORKERS > 1 else None
+    # pondering searches the AI's replies during the human's turn, which only helps when one side is the AI
+    ponderer = Ponderer(model) if PONDER and white_is_player != black_is_player else None
     game_over = False
 
     while is_running:
         is_human_turn = (game_state.turn == WHITE and white_is_player) or (
             game_state.turn == BLACK and black_is_player
         )
+        if ponderer and is_human_turn and not game_over:
+            ponderer.ponder(game_state)
+
         for e in pg.event.get():
             if e.type == pg.QUIT:
                 is_running = False
@@ -83,6 +70,7 @@ def main(model) -> None:
                 if e.key == pg.K_r:
                     game_state = GameState()
                     legal_moves = game_state.get_legal_moves()
+                    legal_move_set = set(legal_moves)
                     selected_square = ()
                     select_log = []
                     should_be_animated = False
@@ -108,8 +96,11 @@ def main(model) -> None:
                     row = select_log[0]
                     col = select_log[1]
                     move = Movement(row, col, game_state.board)
+                    if move.is_pawn_promotion:
+                        # a promotion is legal for every choice or none of them, so any choice can be used to check
+                        move.promotion_choice = QUEEN
 
-                    if move in legal_moves:
+                    if move.packed in legal_move_set:
                         if move.is_pawn_promotion:
                             while True:
                                 possible_choices = [ROOK, KNIGHT, BISHOP, QUEEN]
@@ -120,7 +111,7 @@ def main(model) -> None:
                                     break
                             move.promotion_choice = choice
 
-                        game_state.execute_move(move)
+                        game_state.execute_move(move.packed)
                         game_state_has_changed = True
                         should_be_animated = True
                         selected_square = ()
@@ -133,7 +124,12 @@ def main(model) -> None:
         if not is_human_turn and not game_over:
             if not ai_is_thinking:
                 ai_is_thinking = True
-                move = find_best_move(model, game_state, legal_moves)
+                # a pondered reply already has the AI's move waiting, otherwise it is searched for now
+                move = ponderer.find_best_move(game_state) if ponderer else None
+                if move is None and parallel_search:
+                    move = parallel_search.find_best_move(game_state, legal_moves)
+                elif move is None:
+                    move = find_best_move(model, game_state, legal_moves)
 
                 if move is None:
                     # search for a random move if there were was an error with our main ai algorithm
@@ -146,8 +142,9 @@ def main(model) -> None:
 
         if game_state_has_changed:
             if should_be_animated:
-                animate_move(game_state.move_log[-1], game_state, screen, clock)
+                animate_move(game_state.get_logged_movement(), game_state, screen, clock)
             legal_moves = game_state.get_legal_moves()
+            legal_move_set = set(legal_moves)
 
             should_be_animated = False
             game_state_has_changed = False
@@ -166,12 +163,17 @@ def main(model) -> None:
         clock.tick(FPS)
         pg.display.flip()
 
+    if parallel_search:
+        parallel_search.close()
+    if ponderer:
+        ponderer.stop()
+
 
 if __name__ == "__main__":
     """
     The deep learning model is loaded directly into the main script to prevent having to load it repeatedly when the AI is calculating it's best move.
     """
-    model = BoardEvaluationModel(layer_count=2, batch_size=1024, learning_rate=1e-3)
-    model.load_state_dict(torch.load("model/chkpt.pt"))
-    model.eval()
+    model = load_evaluation_model()
+    # reports the statistics of every search the AI makes
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main(model)
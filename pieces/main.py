@@ -1,7 +1,8 @@
-import numpy as np
-
 from constants import *
-from engine.movement import Movement
+from engine.bitboard import *
+
+ORTHOGONAL_OFFSETS = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+DIAGONAL_OFFSETS = [(-1, -1), (1, -1), (1, 1), (-1, 1)]
 
 
 class Piece:
@@ -14,166 +15,141 @@ class Piece:
         self.type = type
         self.location = location
         self.image_code = f"{self.team[0]}_{self.type}"
+        self.bitboard_index = PIECE_INDEX[(self.team, self.type)]
 
     def __str__(self) -> str:
         return f"{self.team} {self.type} at {self.location}"
 
-    def get_moves(self, row: int, col: int, board: list) -> list:
-        return []
+    def get_attacks(self, square: int, occupied: int) -> int:
+        """
+        Returns a bitboard of every square the piece attacks from the given square.
+        """
+        return EMPTY
+
+    def get_targets(self, square: int, position: object) -> int:
+        """
+        Returns a bitboard of every square the piece can move to from the given square, regardless of checks.
+        """
+        attacks = self.get_attacks(square, position.occupied)
+        return attacks & ~position.occupancy[self.team]
+
+    def can_promote(self, square: int) -> bool:
+        """
+        Returns true or false if every move of the piece from the given square is a promotion.
+        """
+        return False
 
 
-def orthogonal_up(row: int, col: int, board: list, team: str) -> list:
+def offset_table(offsets: list) -> list:
     """
-    Generates a list of movement objects moving continously upwards. Returns an empty list if the offset is not a valid movement.
+    Builds a lookup table of the squares reached from each square by every one of the given offsets that lands on the
+    board.
     """
-    moves = []
-    for i in np.arange(row - 1, -1, -1):
-        square_is_occupied = board[i][col]
-        if square_is_occupied:
-            is_enemy = detect_enemy_piece(board[i][col], team)
-            if is_enemy:
-                moves.append(Movement((row, col), (i, col), board))
-            break
+    table = []
+    for square in range(GRID_DIMENSION * GRID_DIMENSION):
+        row, col = square_location(square)
+        attacks = EMPTY
+        for offset in offsets:
+            end_row = row + offset[0]
+            end_col = col + offset[1]
+            if 0 <= end_row < GRID_DIMENSION and 0 <= end_col < GRID_DIMENSION:
+                attacks |= square_bit(end_row, end_col)
+        table.append(attacks)
+    return table
 
-        moves.append(Movement((row, col), (i, col), board))
-    return moves
 
-
-def orthogonal_left(row: int, col: int, board: list, team: str) -> list:
+def ray_table(offset: tuple) -> list:
     """
-    Generates a list of movement objects moving continously leftwawrds. Returns an empty list if the offset is not a valid movement.
+    Builds a lookup table of the squares reached from each square by moving continously along the given offset until
+    the edge of the board.
     """
-    moves = []
-    for i in np.arange(col - 1, -1, -1):
-        square_is_occupied = board[row][i]
-        if square_is_occupied:
-            is_enemy = detect_enemy_piece(board[row][i], team)
-            if is_enemy:
-                moves.append(Movement((row, col), (row, i), board))
-            break
+    table = []
+    for square in range(GRID_DIMENSION * GRID_DIMENSION):
+        row, col = square_location(square)
+        ray = EMPTY
+        row += offset[0]
+        col += offset[1]
+        while 0 <= row < GRID_DIMENSION and 0 <= col < GRID_DIMENSION:
+            ray |= square_bit(row, col)
+            row += offset[0]
+            col += offset[1]
+        table.append(ray)
+    return table
+
 
-        moves.append(Movement((row, col), (row, i), board))
-    return moves
+RAYS = {offset: ray_table(offset) for offset in ORTHOGONAL_OFFSETS + DIAGONAL_OFFSETS}
 
 
-def orthogonal_down(row: int, col: int, board: list, team: str) -> list:
+def sliding_movement(square: int, offset: tuple, occupied: int) -> int:
     """
-    Generates a list of movement objects moving continously downwards. Returns an empty list if the offset is not a valid movement.
+    Generates a bitboard of the squares reached by moving continously along the given offset, up to and including the
+    first occupied square.
     """
-    moves = []
-    for i in np.arange(row + 1, len(board)):
-        square_is_occupied = board[i][col]
-        if square_is_occupied:
-            is_enemy = detect_enemy_piece(board[i][col], team)
-            if is_enemy:
-                moves.append(Movement((row, col), (i, col), board))
-            break
+    rays = RAYS[offset]
+    ray = rays[square]
+    blockers = ray & occupied
+    if blockers:
+        # moving down or right the nearest blocker has the lowest square index, moving up or left it has the highest
+        if offset[0] * GRID_DIMENSION + offset[1] > 0:
+            nearest_blocker = (blockers & -blockers).bit_length() - 1
+        else:
+            nearest_blocker = blockers.bit_length() - 1
+        # everything past the blocker is the blocker's own ray in the same direction
+        ray ^= rays[nearest_blocker]
+    return ray
 
-        moves.append(Movement((row, col), (i, col), board))
-    return moves
 
-
-def orthogonal_right(row: int, col: int, board: list, team: str) -> list:
+def orthogonal_up(square: int, occupied: int) -> int:
     """
-    Generates a list of movement objects moving continously rightwards. Returns an empty list if the offset is not a valid movement.
+    Generates a bitboard of the squares reached by moving continously upwards.
     """
-    moves = []
-    for i in np.arange(col + 1, len(board)):
-        square_is_occupied = board[row][i]
-        if square_is_occupied:
-            is_enemy = detect_enemy_piece(board[row][i], team)
-            if is_enemy:
-                moves.append(Movement((row, col), (row, i), board))
-            break
-
-        moves.append(Movement((row, col), (row, i), board))
-    return moves
+    return sliding_movement(square, (-1, 0), occupied)
 
 
-def diagonal_up_left(row: int, col: int, board: list, team: str) -> list:
+def orthogonal_left(square: int, occupied: int) -> int:
     """
-    Generates a list of movement objects moving continously up-left. Returns an empty list if the offset is not a valid movement.
+    Generates a bitboard of the squares reached by moving continously leftwards.
     """
-    moves = []
-    for row_up in np.arange(row - 1, -1, -1):
-        col_left = col + (row_up - row)
-        square_is_occupied = board[row_up][col_left]
-        is_in_bounds = col_left >= 0
-        if is_in_bounds:
-            if square_is_occupied:
-                is_enemy = detect_enemy_piece(board[row_up][col_left], team)
-                if is_enemy:
-                    moves.append(Movement((row, col), (row_up, col_left), board))
-                break
+    return sliding_movement(square, (0, -1), occupied)
 
-            moves.append(Movement((row, col), (row_up, col_left), board))
-    return moves
 
-
-def diagonal_down_left(row: int, col: int, board: list, team: str) -> list:
+def orthogonal_down(square: int, occupied: int) -> int:
     """
-    Generates a list of movement objects moving continously down-left. Returns an empty list if the offset is not a valid movement.
+    Generates a bitboard of the squares reached by moving continously downwards.
     """
-    moves = []
-    for row_down in np.arange(row + 1, len(board)):
-        col_left = col - (row_down - row)
-        is_in_bounds = col_left >= 0
-        if is_in_bounds:
-            square_is_occupied = board[row_down][col_left]
-            if square_is_occupied:
-                is_enemy = detect_enemy_piece(board[row_down][col_left], team)
-                if is_enemy:
-                    moves.append(Movement((row, col), (row_down, col_left), board))
-                break
-
-            moves.append(Movement((row, col), (row_down, col_left), board))
-    return moves
+    return sliding_movement(square, (1, 0), occupied)
 
 
-def diagonal_down_right(row: int, col: int, board: list, team: str) -> list:
+def orthogonal_right(square: int, occupied: int) -> int:
     """
-    Generates a list of movement objects moving continously down-right. Returns an empty list if the offset is not a valid movement.
+    Generates a bitboard of the squares reached by moving continously rightwards.
     """
-    moves = []
-    for row_down in np.arange(row + 1, len(board)):
-        col_right = col + (row_down - row)
-        is_in_bounds = col_right < len(board)
-        if is_in_bounds:
-            square_is_occupied = board[row_down][col_right]
-            if square_is_occupied:
-                is_enemy = detect_enemy_piece(board[row_down][col_right], team)
-                if is_enemy:
-                    moves.append(Movement((row, col), (row_down, col_right), board))
-                break
+    return sliding_movement(square, (0, 1), occupied)
 
-            moves.append(Movement((row, col), (row_down, col_right), board))
-    return moves
+
+def diagonal_up_left(square: int, occupied: int) -> int:
+    """
+    Generates a bitboard of the squares reached by moving continously up-left.
+    """
+    return sliding_movement(square, (-1, -1), occupied)
 
 
-def diagonal_up_right(row: int, col: int, board: list, team: str) -> list:
+def diagonal_down_left(square: int, occupied: int) -> int:
     """
-    Generates a list of movement objects moving continously up-right. Returns an empty list if the offset is not a valid movement.
+    Generates a bitboard of the squares reached by moving continously down-left.
     """
-    moves = []
-    for row_up in np.arange(row - 1, -1, -1):
-        col_right = col - (row_up - row)
-        is_in_bounds = col_right < len(board)
-        if is_in_bounds:
-            square_is_occupied = board[row_up][col_right]
-            if square_is_occupied:
-                is_enemy = detect_enemy_piece(board[row_up][col_right], team)
-                if is_enemy:
-                    moves.append(Movement((row, col), (row_up, col_right), board))
-                break
+    return sliding_movement(square, (1, -1), occupied)
+
 
-            moves.append(Movement((row, col), (row_up, col_right), board))
-    return moves
+def diagonal_down_right(square: int, occupied: int) -> int:
+    """
+    Generates a bitboard of the squares reached by moving continously down-right.
+    """
+    return sliding_movement(square, (1, 1), occupied)
 
 
-def detect_enemy_piece(enemy_piece: tuple, team: str) -> bool:
+def diagonal_up_right(square: int, occupied: int) -> int:
     """
-    Detects if an enemy pieces is at the given location.
+    Generates a bitboard of the squares reached by moving continously up-right.
     """
-    return (enemy_piece.team == WHITE and team == BLACK) or (
-        enemy_piece.team == BLACK and team == WHITE
-    )
+    return sliding_movement(square, (-1, 1), occupied)
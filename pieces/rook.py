@@ -1,15 +1,15 @@
-from constants import *
-from pieces.main import *
-
-
-class Rook(Piece):
-    def __init__(self, team: str, location: tuple) -> None:
-        super().__init__(team, ROOK, location)
-
-    def get_moves(self, row: int, col: int, board: list) -> list:
-        moves = []
-        moves += orthogonal_up(row, col, board, self.team)
-        moves += orthogonal_left(row, col, board, self.team)
-        moves += orthogonal_down(row, col, board, self.team)
-        moves += orthogonal_right(row, col, board, self.team)
-        return moves
+from constants import *
+from pieces.main import *
+
+
+class Rook(Piece):
+    def __init__(self, team: str, location: tuple) -> None:
+        super().__init__(team, ROOK, location)
+
+    def get_attacks(self, square: int, occupied: int) -> int:
+        attacks = EMPTY
+        attacks |= orthogonal_up(square, occupied)
+        attacks |= orthogonal_left(square, occupied)
+        attacks |= orthogonal_down(square, occupied)
+        attacks |= orthogonal_right(square, occupied)
+        return attacks